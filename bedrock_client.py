@@ -0,0 +1,274 @@
+"""
+Shared AWS Bedrock runtime client and OCR plumbing for the OCR scripts
+Built once per process (session, credentials, endpoint and service model), so a
+driver that imports several scripts pays the client setup a single time
+"""
+
+import functools
+import io
+import json
+import mimetypes
+import os
+import random
+import re
+import threading
+import time
+
+import boto3
+import botocore.exceptions
+from botocore.config import Config
+from PIL import Image
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+REGION = 'ap-southeast-1'
+
+# Request bodies carry base64 images and the stream sends one JSON frame per token
+# delta; orjson encodes/decodes them in C and works on bytes directly
+if orjson is not None:
+    dumps_body = orjson.dumps
+    loads_body = orjson.loads
+else:
+    def dumps_body(obj):
+        return json.dumps(obj).encode('utf-8')
+
+    loads_body = json.loads
+
+# Standard inference tier by default; BEDROCK_LATENCY=optimized opts into
+# latency-optimized inference, which only some models/regions offer (not the global
+# Claude inference profiles). Where it is rejected the process drops back to standard once
+latency_mode = os.environ.get('BEDROCK_LATENCY', 'standard')
+
+
+@functools.lru_cache(maxsize=1)
+def get_bedrock():
+    # Setup AWS session with bearer token (same pattern as testBedrockOcr.py)
+    session = boto3.Session(
+        aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
+        aws_session_token=os.environ.get('AWS_BEARER_TOKEN_BEDROCK'),
+        region_name=REGION
+    )
+
+    # Vision calls with 8k-token answers can run well past botocore's 60s read timeout;
+    # a short timeout turns them into blind retries of the whole request. The pool is
+    # sized above the batch concurrency so concurrent OCR calls never queue for a socket
+    return session.client(
+        'bedrock-runtime',
+        config=Config(
+            max_pool_connections=int(os.environ.get('BEDROCK_POOL', '32')),
+            read_timeout=300,
+            connect_timeout=10,
+            # with_backoff does the retrying; adaptive mode keeps client-side rate limiting
+            retries={'max_attempts': 1, 'mode': 'adaptive'},
+            tcp_keepalive=True,
+        )
+    )
+
+
+# Throttling and transient service errors worth waiting out; anything else (validation,
+# auth, bad model id) is raised at once. The RAG pipeline's _with_backoff retries the same codes
+RETRYABLE_BEDROCK_CODES = frozenset({
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ServiceUnavailableException',
+    'ModelNotReadyException',
+    'ModelTimeoutException',
+    'ModelStreamErrorException',
+    'InternalServerException',
+})
+BEDROCK_MAX_ATTEMPTS = int(os.environ.get('BEDROCK_MAX_ATTEMPTS', '5'))
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rps seconds apart across all threads; rps <= 0 disables it."""
+
+    def __init__(self, rps):
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+        self.set_rate(rps)
+
+    def set_rate(self, rps):
+        with self.lock:
+            self.interval = 1.0 / rps if rps > 0 else 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        # Reserve the next slot under the lock, then sleep outside it
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time)
+            self.next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Optional steady request rate for Bedrock calls (BEDROCK_RPS=0, the default, means no
+# pacing). Single-image runs go at full speed; batch mode paces itself at BATCH_BEDROCK_RPS
+# unless BEDROCK_RPS is set, so concurrent calls stay near the account's quota
+rate_limiter = RateLimiter(float(os.environ.get('BEDROCK_RPS', '0')))
+BATCH_BEDROCK_RPS = 4.0
+
+
+def pace_batch():
+    """Turn on batch pacing at BATCH_BEDROCK_RPS, unless BEDROCK_RPS chose a rate already."""
+    if 'BEDROCK_RPS' not in os.environ:
+        rate_limiter.set_rate(BATCH_BEDROCK_RPS)
+
+
+def with_backoff(call, **kwargs):
+    """Run a Bedrock call, retrying retryable errors with full-jitter exponential backoff.
+
+    The only retry layer (the client has botocore max_attempts=1), so an image hitting
+    the account's quota during a batch waits (~1s, 2s, 4s, 8s) instead of failing.
+    """
+    for attempt in range(BEDROCK_MAX_ATTEMPTS):
+        # Retries are paced too, so they never add to a throttling burst
+        rate_limiter.acquire()
+        try:
+            return call(**kwargs)
+        except botocore.exceptions.ClientError as e:
+            code = e.response.get('Error', {}).get('Code', '')
+            # Errors raised inside an event stream arrive camel-cased (throttlingException)
+            code = code[:1].upper() + code[1:]
+            if code not in RETRYABLE_BEDROCK_CODES or attempt == BEDROCK_MAX_ATTEMPTS - 1:
+                raise
+        time.sleep(random.uniform(0, min(30.0, 2.0 ** attempt)))
+
+
+def invoke_with_latency(invoke, **kwargs):
+    global latency_mode
+    mode = latency_mode
+    try:
+        return with_backoff(invoke, performanceConfigLatency=mode, **kwargs)
+    except get_bedrock().exceptions.ValidationException as e:
+        # Only a rejection of the latency setting itself falls back; a bad image or
+        # body is raised as it is
+        message = str(e).lower()
+        if mode == 'standard' or ('performanceconfig' not in message and 'latency' not in message):
+            raise
+        if latency_mode != 'standard':
+            print("Latency-optimized inference unavailable for this model, using standard")
+            latency_mode = 'standard'
+        return with_backoff(invoke, performanceConfigLatency='standard', **kwargs)
+
+
+def iter_stream_text(response):
+    """Yield the text deltas of an invoke_model_with_response_stream response as they arrive."""
+    for event in response['body']:
+        chunk = loads_body(event['chunk']['bytes'])
+
+        if chunk['type'] == 'content_block_delta':
+            if 'text' in chunk['delta']:
+                yield chunk['delta']['text']
+        elif chunk['type'] == 'message_stop':
+            break
+
+
+def _read_stream_text(invoke, **kwargs):
+    return "".join(iter_stream_text(invoke(**kwargs)))
+
+
+def invoke_stream_text(invoke, **kwargs):
+    """Full text of an invoke_model_with_response_stream call.
+
+    Opening and draining the stream retry as one unit, so a throttling or model stream
+    error raised mid-stream restarts the request; text from a failed attempt is dropped.
+    """
+    return invoke_with_latency(functools.partial(_read_stream_text, invoke), **kwargs)
+
+
+# Image types Claude vision accepts; anything else is sent labelled as PNG, as before
+_CLAUDE_IMAGE_TYPES = frozenset({'image/png', 'image/jpeg', 'image/gif', 'image/webp'})
+
+
+def image_media_type(image_path):
+    media_type = mimetypes.guess_type(image_path)[0]
+    return media_type if media_type in _CLAUDE_IMAGE_TYPES else 'image/png'
+
+
+def build_request(image_data, media_type, prompt, max_tokens):
+    """Anthropic Messages body for one OCR call: the base64 image, then the prompt."""
+    # Image before text, as Anthropic recommends for vision. No prompt-cache breakpoint:
+    # both OCR prompts are below Claude's 1024-token minimum cacheable prefix
+    return {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image",
+                        "source": {
+                            "type": "base64",
+                            "media_type": media_type,
+                            "data": image_data
+                        }
+                    },
+                    {
+                        "type": "text",
+                        "text": prompt
+                    }
+                ]
+            }
+        ]
+    }
+
+
+# Sub-image crops stay lossless PNG; zlib level 1 encodes them several times faster
+# than Pillow's default of 6 for a modestly bigger file
+SUBIMG_PNG_COMPRESS_LEVEL = 1
+
+# Re-encode the upload as JPEG when that is smaller than the original file, shrinking
+# the base64 payload; OCR_JPEG_QUALITY=0 sends the file unchanged
+jpeg_quality = int(os.environ.get('OCR_JPEG_QUALITY', '85'))
+
+# Claude downsamples anything whose long side exceeds 1568 px, so extra pixels only
+# cost upload time; larger images are shrunk to fit (OCR_MAX_SIDE=0 keeps full size)
+max_side = int(os.environ.get('OCR_MAX_SIDE', '1568'))
+
+# Files this small that already fit max_side are sent without re-encoding
+SMALL_UPLOAD_BYTES = 400_000
+
+
+def jpeg_payload(image, quality, max_side=0):
+    if 'A' in image.getbands():
+        # Flatten transparency onto white rather than the black convert('RGB') gives
+        rgb = Image.new('RGB', image.size, 'white')
+        rgb.paste(image, mask=image.getchannel('A'))
+    else:
+        rgb = image.convert('RGB')
+    if max_side and max(rgb.size) > max_side:
+        rgb.thumbnail((max_side, max_side), Image.LANCZOS)
+    buf = io.BytesIO()
+    rgb.save(buf, format='JPEG', quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def upload_payload(image_bytes, image, media_type):
+    """(bytes, media type) to send for an image read as image_bytes and opened as image."""
+    oversized = max_side > 0 and max(image.size) > max_side
+    if jpeg_quality > 0 and (oversized or len(image_bytes) >= SMALL_UPLOAD_BYTES):
+        jpeg_bytes = jpeg_payload(image, jpeg_quality, max_side)
+        if oversized or len(jpeg_bytes) < len(image_bytes):
+            return jpeg_bytes, 'image/jpeg'
+    return image_bytes, media_type
+
+
+def visual_element_note(text):
+    return f"\n\n> 📷 **Visual Element:** {text.strip()}\n\n"
+
+
+# Image placeholders: [IMAGE: description | Position: position | ApproxPercent: X% from top,
+# Y% from left] (groups 1-4), or any other [IMAGE: ...] without coordinates (group 5).
+# One pattern for both forms so the markdown is rewritten in a single pass
+IMAGE_RE = re.compile(
+    r'\[IMAGE:\s*(?:([^\|]+)\s*\|\s*Position:\s*([^\|]+)\s*\|\s*ApproxPercent:\s*(\d+)%\s*from top,\s*(\d+)%\s*from left'
+    r'|([^\]]+))\]',
+    re.IGNORECASE
+)
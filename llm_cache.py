@@ -0,0 +1,71 @@
+"""
+Disk cache for Bedrock OCR responses
+One JSON file per key under data/ocr_cache/, so re-running an OCR script on the
+same image, prompt and model skips the Bedrock call entirely
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+CACHE_DIR = os.environ.get('OCR_CACHE_DIR', os.path.join('data', 'ocr_cache'))
+
+# Entries older than this many days count as misses; 0 keeps them forever
+CACHE_TTL_DAYS = float(os.environ.get('CACHE_TTL_DAYS', '30'))
+
+
+def make_key(image_bytes, prompt, model_id):
+    h = hashlib.sha256(image_bytes)
+    # Separators keep (prompt, model) pairs from running into each other
+    h.update(b'\0' + prompt.encode('utf-8'))
+    h.update(b'\0' + model_id.encode('utf-8'))
+    return h.hexdigest()
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def get(key):
+    """Cached value for key, or None on a miss or an expired / unreadable entry."""
+    path = _path(key)
+    try:
+        if CACHE_TTL_DAYS and time.time() - os.path.getmtime(path) > CACHE_TTL_DAYS * 86400:
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def put(key, value):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write a private temp file then rename, so an interrupted run never leaves a truncated
+    # entry behind and two threads storing the same key never interleave their writes
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, _path(key))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# First line of every OCR markdown output, naming the (image, prompt, model) key it was built from
+_SOURCE_MARKER = '<!-- image_sha256: {} -->\n'
+
+
+def source_marker(key):
+    return _SOURCE_MARKER.format(key)
+
+
+def output_is_current(path, key):
+    """True if the markdown at path was generated from exactly this image, prompt and model."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.readline() == source_marker(key)
+    except (OSError, UnicodeDecodeError):
+        return False
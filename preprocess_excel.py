@@ -1,21 +1,37 @@
 #!/usr/bin/env python3
 
 import argparse
+import array
+import atexit
+import base64
+import datetime
 import hashlib
+import io
 import json
 import logging
+import mmap
 import os
+import queue
 import re
+import select
 import shutil
 import sys
+import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from itertools import accumulate
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Tuple
 import subprocess
 import time as _time
 
-# Third-party imports are imported lazily where possible to reduce startup time
+# Third-party imports are imported lazily where possible to reduce startup time;
+# orjson is small and used by every JSON write, so it is resolved once here
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(
@@ -35,12 +51,73 @@ class SheetAssetPaths:
     ocr_path: Optional[Path]
 
 
+class SheetCells:
+    """Column-oriented store for extracted cells; per-cell dicts are only built when iterated."""
+    __slots__ = ("addresses", "rows", "cols", "values", "formulas", "hyperlinks", "comments")
+
+    def __init__(self) -> None:
+        self.addresses: List[str] = []
+        self.rows = array.array('i')
+        self.cols = array.array('i')
+        self.values: List[object] = []
+        self.formulas: List[Optional[str]] = []
+        self.hyperlinks: List[Optional[str]] = []
+        self.comments: List[Optional[str]] = []
+
+    def append(self, address: str, row: int, col: int, value, formula: Optional[str], hyperlink: Optional[str], comment: Optional[str]) -> None:
+        self.addresses.append(address)
+        self.rows.append(row)
+        self.cols.append(col)
+        self.values.append(value)
+        self.formulas.append(formula)
+        self.hyperlinks.append(hyperlink)
+        self.comments.append(comment)
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def __iter__(self) -> Iterable[Dict]:
+        for address, r, c, v, formula, hyperlink, comment in zip(
+            self.addresses, self.rows, self.cols, self.values, self.formulas, self.hyperlinks, self.comments
+        ):
+            yield {
+                "address": address,
+                "row": r,
+                "col": c,
+                "value": v,
+                "formula": formula,
+                "data_type": None,
+                "hyperlink": hyperlink,
+                "comment": comment,
+            }
+
+
+def _json_default(obj):
+    # json/orjson hook: materialize SheetCells into the per-cell dict list on write
+    if isinstance(obj, SheetCells):
+        return list(obj)
+    # Date/time cell values as ISO strings, matching what orjson writes natively, so
+    # both backends produce the same JSON
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def write_json(path: Path, obj) -> None:
+    """Write obj as indented UTF-8 JSON, via orjson when it is installed."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(obj, default=_json_default, option=orjson.OPT_INDENT_2))
+        return
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2, default=_json_default)
+
+
 @dataclass
 class ExtractedSheet:
     workbook_id: str
     sheet_index: int
     sheet_name: str
-    cells: List[Dict]
+    cells: SheetCells
     named_ranges: List[Dict]
     images: List[Dict]
     smartart_drawings: List[str]
@@ -52,8 +129,13 @@ class ExtractedSheet:
 # Filesystem helpers
 # -----------------------------
 
+_SANITIZE_RE = re.compile(r"[^A-Za-z0-9._-]")
+
+
+# Sheet names repeat across the pdf/png/ocr/json paths built for each sheet
+@lru_cache(maxsize=1024)
 def sanitize_name(name: str) -> str:
-    safe = re.sub(r"[^A-Za-z0-9._-]", "_", name)
+    safe = _SANITIZE_RE.sub("_", name)
     # Avoid reserved names and overly long filenames
     return safe[:120] if len(safe) > 120 else safe
 
@@ -62,17 +144,234 @@ def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+# -----------------------------
+# XML helpers (lxml)
+# -----------------------------
+
+# Relationship Type URIs are a fixed set; accept both transitional and strict OOXML
+_REL_TYPE_BASES = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "http://purl.oclc.org/ooxml/officeDocument/relationships",
+)
+HYPERLINK_REL_TYPES = frozenset(f"{base}/hyperlink" for base in _REL_TYPE_BASES)
+COMMENTS_REL_TYPES = frozenset(f"{base}/comments" for base in _REL_TYPE_BASES)
+IMAGE_REL_TYPES = frozenset(f"{base}/image" for base in _REL_TYPE_BASES)
+
+# lxml parsers must not be shared across threads, so keep one per thread
+_xml_parser_local = threading.local()
+
+
+def load_xml(data: bytes):
+    """Parse an OOXML part with a reusable parser that never resolves entities or fetches DTDs."""
+    from lxml import etree
+
+    parser = getattr(_xml_parser_local, "parser", None)
+    if parser is None:
+        parser = etree.XMLParser(resolve_entities=False, no_network=True, collect_ids=False, huge_tree=False)
+        _xml_parser_local.parser = parser
+    return etree.fromstring(data, parser)
+
+
+def iterparse_cleared(stream, tag: str):
+    """Stream `tag` elements out of an OOXML part, freeing each one (and earlier siblings) once the caller moves on."""
+    from lxml import etree
+
+    for _, elem in etree.iterparse(stream, events=('end',), tag=tag, resolve_entities=False, no_network=True, collect_ids=False):
+        yield elem
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+# Prefixes shared by every compiled XPath below ('pr' is the package-relationships namespace)
+_XPATH_NS = {
+    'a': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'pr': 'http://schemas.openxmlformats.org/package/2006/relationships',
+    'xdr': 'http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing',
+    'dml': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+}
+
+
+def _xpath(expr: str):
+    """Compiled etree.XPath for expr, cached per thread like the parser."""
+    cache = getattr(_xml_parser_local, "xpaths", None)
+    if cache is None:
+        cache = _xml_parser_local.xpaths = {}
+    compiled = cache.get(expr)
+    if compiled is None:
+        from lxml import etree
+
+        compiled = cache[expr] = etree.XPath(expr, namespaces=_XPATH_NS)
+    return compiled
+
+
+# -----------------------------
+# Workbook package context (.xlsx zip)
+# -----------------------------
+
+class _MappedFile(io.RawIOBase):
+    """Seekable read-only file object over an mmap (mmap itself has no seekable() before 3.13)."""
+
+    def __init__(self, mm: mmap.mmap) -> None:
+        self._mm = mm
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        return self._mm.read(None if size is None or size < 0 else size)
+
+    def readinto(self, b) -> int:
+        data = self._mm.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._mm.seek(offset, whence)
+        return self._mm.tell()
+
+    def tell(self) -> int:
+        return self._mm.tell()
+
+    def close(self) -> None:
+        if not self.closed:
+            self._mm.close()
+        super().close()
+
+
+def _open_zip_mmap(xlsx_path: Path) -> Tuple["zipfile.ZipFile", Optional[_MappedFile]]:
+    # Read the archive through a read-only memory map so central-directory and member
+    # reads are served from the page cache; plain file access if mapping is not possible
+    import zipfile
+
+    try:
+        with open(xlsx_path, 'rb') as fh:
+            mapped = _MappedFile(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError):
+        return zipfile.ZipFile(xlsx_path, 'r'), None
+    try:
+        return zipfile.ZipFile(mapped, 'r'), mapped
+    except Exception:
+        mapped.close()
+        raise
+
+
+@dataclass
+class WorkbookContext:
+    """One open .xlsx archive plus the workbook-level parts every helper needs."""
+    zf: "zipfile.ZipFile"
+    names: frozenset
+    wb_root: object
+    wb_rels_root: Optional[object]
+    sheet_id_to_name: Dict[str, str]  # workbook r:id -> sheet name
+    r_id_to_target: Dict[str, str]  # workbook r:id -> target, e.g. worksheets/sheet1.xml
+    path: Optional[Path] = None
+    mapped: Optional[_MappedFile] = None
+    # Parsed once per workbook for the overlay, which may run for every sheet
+    sheet_drawings: Optional[Dict[str, List[str]]] = None  # sheet name -> drawing file names
+    drawing_rels: Dict[str, Dict[str, str]] = field(default_factory=dict)  # rels path -> image r:id -> media path
+    named_ranges: Optional[List[Dict]] = None  # workbook definedNames, shared by every sheet's JSON
+
+    def reopen(self) -> "WorkbookContext":
+        """Same parsed workbook parts over a fresh zip handle (ZipFile reads are not thread-safe)."""
+        zf, mapped = _open_zip_mmap(self.path)
+        return replace(self, zf=zf, mapped=mapped)
+
+    def close(self) -> None:
+        self.zf.close()
+        if self.mapped is not None:
+            self.mapped.close()
+
+    def __enter__(self) -> "WorkbookContext":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_workbook_context(xlsx_path: Path) -> WorkbookContext:
+    """Open the workbook zip once and parse xl/workbook.xml and its rels for reuse."""
+    zf, mapped = _open_zip_mmap(xlsx_path)
+    try:
+        names = frozenset(zf.namelist())
+        wb_root = load_xml(zf.read('xl/workbook.xml'))
+        sheet_id_to_name: Dict[str, str] = {}
+        for sheet in _xpath('.//a:sheets/a:sheet')(wb_root):
+            r_id = sheet.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id')
+            sheet_id_to_name[r_id] = sheet.get('name')
+
+        wb_rels_root = None
+        r_id_to_target: Dict[str, str] = {}
+        if 'xl/_rels/workbook.xml.rels' in names:
+            wb_rels_root = load_xml(zf.read('xl/_rels/workbook.xml.rels'))
+            for rel in _xpath('.//pr:Relationship')(wb_rels_root):
+                r_id_to_target[rel.get('Id')] = rel.get('Target')
+    except Exception:
+        zf.close()
+        if mapped is not None:
+            mapped.close()
+        raise
+    return WorkbookContext(
+        zf=zf,
+        names=names,
+        wb_root=wb_root,
+        wb_rels_root=wb_rels_root,
+        sheet_id_to_name=sheet_id_to_name,
+        r_id_to_target=r_id_to_target,
+        path=Path(xlsx_path),
+        mapped=mapped,
+    )
+
+
 # -----------------------------
 # Hash & workbook load
 # -----------------------------
 
+_HASH_CHUNK_SIZE = 4 * 1024 * 1024
+_HASH_BUFFERS = 3
+
+
+def _read_chunks_into(file_path: Path, free: "queue.Queue", filled: "queue.Queue") -> None:
+    # Reader side of compute_sha256: fill free buffers and hand them over as (view, n)
+    try:
+        with file_path.open("rb", buffering=0) as f:
+            while True:
+                mv = free.get()
+                n = f.readinto(mv)
+                if not n:
+                    break
+                filled.put((mv, n))
+    except Exception as e:
+        filled.put((None, e))
+        return
+    filled.put((None, None))
+
+
 def compute_sha256(file_path: Path) -> str:
     logger.info(f"Computing SHA-256 hash for {file_path.name}")
     start_time = time.time()
     h = hashlib.sha256()
-    with file_path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
+    # Overlap disk reads with hashing: a reader thread fills the next buffer while this
+    # thread hashes the previous one (file reads and hashlib updates both release the GIL).
+    # A single running digest is kept so the workbook_id format is unchanged.
+    free: "queue.Queue" = queue.Queue()
+    filled: "queue.Queue" = queue.Queue()
+    for _ in range(_HASH_BUFFERS):
+        free.put(memoryview(bytearray(_HASH_CHUNK_SIZE)))
+    reader = threading.Thread(target=_read_chunks_into, args=(file_path, free, filled), name="sha256-reader", daemon=True)
+    reader.start()
+    while True:
+        mv, n = filled.get()
+        if mv is None:
+            if n is not None:
+                raise n
+            break
+        h.update(mv[:n])
+        free.put(mv)
+    reader.join()
     elapsed = time.time() - start_time
     logger.info(f"Hash computed in {elapsed:.2f}s: sha256:{h.hexdigest()[:16]}...")
     return f"sha256:{h.hexdigest()}"
@@ -88,70 +387,57 @@ def load_values_workbook(path: Path):
     logger.info(f"Loading workbook (values only): {path.name}")
     start_time = time.time()
     values_wb = load_workbook(
-        filename=str(path), read_only=True, data_only=True, keep_links=True
+        filename=str(path), read_only=True, data_only=True, keep_links=False
     )
     elapsed = time.time() - start_time
     logger.info(f"Values workbook loaded in {elapsed:.2f}s")
     return values_wb
 
 
-def a1_from_row_col(row: int, col: int) -> str:
-    from openpyxl.utils import get_column_letter
-
-    return f"{get_column_letter(col)}{row}"
+# Matches: =... Sheet Name!A1 or 'Sheet Name'!A1 or Sheet_1!A1:Z9
+_CROSS_SHEET_RE = re.compile(r"(?i)=.*?([A-Za-z0-9_ ]+)!\$?[A-Z]+\$?\d+(?::\$?[A-Z]+\$?\d+)?")
 
 
 def regex_cross_sheet_refs(text: str) -> List[str]:
     # Extract referenced sheet names from formula text
-    # Matches: =... Sheet Name!A1 or 'Sheet Name'!A1 or Sheet_1!A1:Z9
-    pattern = re.compile(r"(?i)=.*?([A-Za-z0-9_ ]+)!\$?[A-Z]+\$?\d+(?::\$?[A-Z]+\$?\d+)?")
-    names: List[str] = []
-    for m in pattern.finditer(text or ""):
-        names.append(m.group(1).strip().strip("'\""))
-    # Deduplicate
-    unique = []
-    for n in names:
-        if n not in unique:
-            unique.append(n)
-    return unique
+    # Deduplicate, keeping first-seen order
+    return list(dict.fromkeys(m.group(1).strip().strip("'\"") for m in _CROSS_SHEET_RE.finditer(text or "")))
 
 
 def is_effectively_visible_state(state: str) -> bool:
     return state == "visible"
 
 
-def parse_defined_names_from_workbook(xlsx_path: Path) -> List[Dict]:
-    # Parse xl/workbook.xml definedNames for named ranges
-    import zipfile
-    from lxml import etree
-
+def parse_defined_names_from_workbook(ctx: WorkbookContext) -> List[Dict]:
+    # Parse xl/workbook.xml definedNames for named ranges; workbook-global, so once per context
+    if ctx.named_ranges is not None:
+        return ctx.named_ranges
     named_ranges: List[Dict] = []
     try:
-        with zipfile.ZipFile(xlsx_path, 'r') as zf:
-            if 'xl/workbook.xml' not in zf.namelist():
-                return named_ranges
-            wb_root = etree.fromstring(zf.read('xl/workbook.xml'))
-            ns = {'a': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
-            for dn in wb_root.xpath('.//a:definedNames/a:definedName', namespaces=ns):
-                name = dn.get('name')
-                attr_text = (dn.text or '').strip()
-                local_sheet_id = dn.get('localSheetId')
-                named_ranges.append({
-                    'name': name,
-                    'attr_text': attr_text,
-                    'localSheetId': local_sheet_id
-                })
+        for dn in _xpath('.//a:definedNames/a:definedName')(ctx.wb_root):
+            name = dn.get('name')
+            attr_text = (dn.text or '').strip()
+            local_sheet_id = dn.get('localSheetId')
+            named_ranges.append({
+                'name': name,
+                'attr_text': attr_text,
+                'localSheetId': local_sheet_id
+            })
     except Exception as e:
         logger.warning(f"Failed to parse defined names: {e}")
+    ctx.named_ranges = named_ranges
     return named_ranges
 
 
-def extract_sheet_structured(values_ws, sheet_name: str, formulas_map: Dict[str, str], hyperlinks_map: Dict[str, str], comments_map: Dict[str, str]) -> Tuple[List[Dict], List[str]]:
+def extract_sheet_structured(values_ws, sheet_name: str, formulas_map: Dict[str, str], hyperlinks_map: Dict[str, str], comments_map: Dict[str, str]) -> Tuple[SheetCells, List[str]]:
+    from openpyxl.utils import get_column_letter
+
     logger.info(f"Extracting structured data from sheet: {sheet_name}")
     start_time = time.time()
     
-    cells: List[Dict] = []
+    cells = SheetCells()
     links_to: List[str] = []
+    links_seen: set = set()
 
     # Iterate using meta_ws for full metadata; pull values from values_ws
     # We cannot rely on UsedRange; iter_rows with min/max bounds
@@ -160,14 +446,16 @@ def extract_sheet_structured(values_ws, sheet_name: str, formulas_map: Dict[str,
     
     logger.info(f"Processing range: {max_row} rows x {max_col} columns")
 
+    col_letters = [get_column_letter(c) for c in range(1, max_col + 1)]
+
+    # Stream each row once; per-cell .cell() lookups re-scan the sheet in read-only mode.
+    # Rows missing at the end of the sheet XML are padded so metadata-only cells still count.
+    rows = values_ws.iter_rows(min_row=1, max_row=max_row, min_col=1, max_col=max_col, values_only=True)
+    empty_row = (None,) * max_col
     for r in range(1, max_row + 1):
-        for c in range(1, max_col + 1):
-            address = a1_from_row_col(r, c)
-            # Pull value from values_ws
-            try:
-                v = values_ws.cell(row=r, column=c).value
-            except Exception:
-                v = None
+        row_values = next(rows, empty_row)
+        for c, v in enumerate(row_values, start=1):
+            address = f"{col_letters[c - 1]}{r}"
             # Detect formula
             formula = formulas_map.get(address)
             # Hyperlink
@@ -178,22 +466,14 @@ def extract_sheet_structured(values_ws, sheet_name: str, formulas_map: Dict[str,
             if formula:
                 refs = regex_cross_sheet_refs(formula)
                 for nm in refs:
-                    if nm not in links_to:
+                    if nm not in links_seen:
+                        links_seen.add(nm)
                         links_to.append(nm)
 
             # Only include non-empty cells or those with metadata
             include = (v is not None) or (formula is not None) or (hyperlink is not None) or (comment is not None)
             if include:
-                cells.append({
-                    "address": address,
-                    "row": r,
-                    "col": c,
-                    "value": v,
-                    "formula": formula,
-                    "data_type": None,
-                    "hyperlink": hyperlink,
-                    "comment": comment,
-                })
+                cells.append(address, r, c, v, formula, hyperlink, comment)
 
     elapsed = time.time() - start_time
     logger.info(f"Extracted {len(cells)} cells, {len(links_to)} cross-sheet links in {elapsed:.2f}s")
@@ -204,9 +484,18 @@ def extract_sheet_structured(values_ws, sheet_name: str, formulas_map: Dict[str,
 # Media & DrawingML extraction from .xlsx zip
 # -----------------------------
 
-def extract_media_and_drawings(xlsx_path: Path, out_media: Path, out_drawings: Path) -> Tuple[List[Dict], List[str]]:
-    import zipfile
+_MEDIA_COPY_BUFSIZE = 1 << 20  # 1 MiB per copyfileobj read
+
+
+def _copy_zip_members(ctx: WorkbookContext, jobs: List[Tuple[str, Path]]) -> None:
+    # Worker: copy a batch of members through this worker's own zip handle
+    with ctx.reopen() as worker_ctx:
+        for member, target in jobs:
+            with worker_ctx.zf.open(member) as src, target.open('wb') as dst:
+                shutil.copyfileobj(src, dst, _MEDIA_COPY_BUFSIZE)
+
 
+def extract_media_and_drawings(ctx: WorkbookContext, out_media: Path, out_drawings: Path) -> Tuple[List[Dict], List[str]]:
     logger.info("Extracting media and drawings from .xlsx")
     start_time = time.time()
     
@@ -216,116 +505,91 @@ def extract_media_and_drawings(xlsx_path: Path, out_media: Path, out_drawings: P
     images: List[Dict] = []
     drawing_files: List[str] = []
 
-    with zipfile.ZipFile(xlsx_path, 'r') as zf:
-        for member in zf.namelist():
-            if member.startswith('xl/media/') and not member.endswith('/'):
-                target = out_media / Path(member).name
-                with zf.open(member) as src, target.open('wb') as dst:
-                    shutil.copyfileobj(src, dst)
-                images.append({"path": str(target)})
-            elif member.startswith('xl/drawings/') and member.endswith('.xml'):
-                target = out_drawings / Path(member).name
-                with zf.open(member) as src, target.open('wb') as dst:
-                    shutil.copyfileobj(src, dst)
-                drawing_files.append(member)
+    # One pass over the archive to decide what to copy; keyed by target so a
+    # repeated file name still resolves to the last member, as a serial copy would
+    copy_jobs: Dict[Path, str] = {}
+    for member in ctx.zf.namelist():
+        if member.startswith('xl/media/') and not member.endswith('/'):
+            target = out_media / Path(member).name
+            copy_jobs[target] = member
+            images.append({"path": str(target)})
+        elif member.startswith('xl/drawings/') and member.endswith('.xml'):
+            target = out_drawings / Path(member).name
+            copy_jobs[target] = member
+            drawing_files.append(member)
+
+    jobs = [(member, target) for target, member in copy_jobs.items()]
+    workers = min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1:
+        for member, target in jobs:
+            with ctx.zf.open(member) as src, target.open('wb') as dst:
+                shutil.copyfileobj(src, dst, _MEDIA_COPY_BUFSIZE)
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+
+        # zlib inflate and file writes release the GIL; each worker gets its own ZipFile
+        batches = [jobs[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="media-copy") as pool:
+            for fut in [pool.submit(_copy_zip_members, ctx, batch) for batch in batches]:
+                fut.result()
 
     elapsed = time.time() - start_time
     logger.info(f"Extracted {len(images)} media files, {len(drawing_files)} drawings in {elapsed:.2f}s")
     return images, drawing_files
 
 
-def map_sheet_to_drawings(xlsx_path: Path) -> Dict[str, List[str]]:
+def map_sheet_to_drawings(ctx: WorkbookContext) -> Dict[str, List[str]]:
     # Best-effort mapping using rels: xl/worksheets/_rels/sheetX.xml.rels → drawing rels
-    import zipfile
-    from lxml import etree
-
+    if ctx.sheet_drawings is not None:
+        return ctx.sheet_drawings
     mapping: Dict[str, List[str]] = {}
 
-    with zipfile.ZipFile(xlsx_path, 'r') as zf:
-        # Build sheetId → sheetName mapping
-        workbook_xml = zf.read('xl/workbook.xml')
-        wb_root = etree.fromstring(workbook_xml)
-        ns = {
-            'a': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
-            'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
-        }
-        sheet_id_to_name: Dict[str, str] = {}
-        for sheet in wb_root.xpath('.//a:sheets/a:sheet', namespaces=ns):
-            name = sheet.get('name')
-            r_id = sheet.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id')
-            sheet_id_to_name[r_id] = name
-
-        # Resolve workbook rels to sheet xml files
-        wb_rels_xml = zf.read('xl/_rels/workbook.xml.rels')
-        wb_rels_root = etree.fromstring(wb_rels_xml)
-        rels_ns = {'r': 'http://schemas.openxmlformats.org/package/2006/relationships'}
-        r_id_to_target: Dict[str, str] = {}
-        for rel in wb_rels_root.xpath('.//r:Relationship', namespaces=rels_ns):
-            r_id_to_target[rel.get('Id')] = rel.get('Target')  # e.g., worksheets/sheet1.xml
-
-        # For each sheet rels, find drawing targets
-        for r_id, target in r_id_to_target.items():
-            if not target.startswith('worksheets/'):
-                continue
-            sheet_name = sheet_id_to_name.get(r_id)
-            if not sheet_name:
-                continue
-            rels_path = f"xl/worksheets/_rels/{Path(target).name}.rels"
-            if rels_path not in zf.namelist():
-                continue
-            rels_xml = zf.read(rels_path)
-            rels_root = etree.fromstring(rels_xml)
-            drawings_for_sheet: List[str] = []
-            for rel in rels_root.xpath('.//r:Relationship', namespaces=rels_ns):
-                target_rel = rel.get('Target')  # e.g., ../drawings/drawing1.xml
-                if 'drawings/' in target_rel:
-                    drawings_for_sheet.append(Path(target_rel).name)
-            if drawings_for_sheet:
-                mapping[sheet_name] = drawings_for_sheet
-
+    # For each sheet rels, find drawing targets
+    for r_id, target in ctx.r_id_to_target.items():
+        if not target.startswith('worksheets/'):
+            continue
+        sheet_name = ctx.sheet_id_to_name.get(r_id)
+        if not sheet_name:
+            continue
+        rels_path = f"xl/worksheets/_rels/{Path(target).name}.rels"
+        if rels_path not in ctx.names:
+            continue
+        rels_root = load_xml(ctx.zf.read(rels_path))
+        drawings_for_sheet: List[str] = []
+        for rel in _xpath('.//pr:Relationship')(rels_root):
+            target_rel = rel.get('Target')  # e.g., ../drawings/drawing1.xml
+            if 'drawings/' in target_rel:
+                drawings_for_sheet.append(Path(target_rel).name)
+        if drawings_for_sheet:
+            mapping[sheet_name] = drawings_for_sheet
+
+    ctx.sheet_drawings = mapping
     return mapping
 
 
-def get_ordered_sheet_info(xlsx_path: Path) -> Tuple[List[Dict], Dict[str, str]]:
+def get_ordered_sheet_info(ctx: WorkbookContext) -> Tuple[List[Dict], Dict[str, str]]:
     # Returns ordered list of dicts: {name, state, r_id, sheet_xml, sheet_rels}
     # and mapping r_id -> target (worksheets/sheetN.xml)
-    import zipfile
-    from lxml import etree
-
-    with zipfile.ZipFile(xlsx_path, 'r') as zf:
-        wb_root = etree.fromstring(zf.read('xl/workbook.xml'))
-        ns = {
-            'a': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
-            'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
-        }
-        wb_rels_root = etree.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
-        rels_ns = {'r': 'http://schemas.openxmlformats.org/package/2006/relationships'}
-        r_id_to_target: Dict[str, str] = {}
-        for rel in wb_rels_root.xpath('.//r:Relationship', namespaces=rels_ns):
-            r_id_to_target[rel.get('Id')] = rel.get('Target')
-
-        ordered: List[Dict] = []
-        for sheet in wb_root.xpath('.//a:sheets/a:sheet', namespaces=ns):
-            name = sheet.get('name')
-            r_id = sheet.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id')
-            state = sheet.get('state', 'visible')
-            target = r_id_to_target.get(r_id, '')  # e.g., worksheets/sheet1.xml
-            sheet_xml = f"xl/{target}" if target else ''
-            sheet_rels = f"xl/worksheets/_rels/{Path(target).name}.rels" if target else ''
-            ordered.append({
-                'name': name,
-                'state': state,
-                'r_id': r_id,
-                'sheet_xml': sheet_xml,
-                'sheet_rels': sheet_rels,
-            })
-    return ordered, r_id_to_target
-
-
-def parse_sheet_meta_maps(xlsx_path: Path, sheet_xml_path: str, sheet_rels_path: str) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+    ordered: List[Dict] = []
+    for sheet in _xpath('.//a:sheets/a:sheet')(ctx.wb_root):
+        name = sheet.get('name')
+        r_id = sheet.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id')
+        state = sheet.get('state', 'visible')
+        target = ctx.r_id_to_target.get(r_id, '')  # e.g., worksheets/sheet1.xml
+        sheet_xml = f"xl/{target}" if target else ''
+        sheet_rels = f"xl/worksheets/_rels/{Path(target).name}.rels" if target else ''
+        ordered.append({
+            'name': name,
+            'state': state,
+            'r_id': r_id,
+            'sheet_xml': sheet_xml,
+            'sheet_rels': sheet_rels,
+        })
+    return ordered, ctx.r_id_to_target
+
+
+def parse_sheet_meta_maps(ctx: WorkbookContext, sheet_xml_path: str, sheet_rels_path: str) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
     # Returns maps: formulas_map[address] = '=...', hyperlinks_map[address] = url, comments_map[address] = text
-    import zipfile
-    from lxml import etree
     from openpyxl.utils.cell import range_boundaries
     from openpyxl.utils import get_column_letter
 
@@ -333,92 +597,133 @@ def parse_sheet_meta_maps(xlsx_path: Path, sheet_xml_path: str, sheet_rels_path:
     hyperlinks: Dict[str, str] = {}
     comments: Dict[str, str] = {}
 
-    with zipfile.ZipFile(xlsx_path, 'r') as zf:
-        # Parse relationships to resolve hyperlinks and comments
-        id_to_link: Dict[str, str] = {}
-        comments_target: Optional[str] = None
-        try:
-            if sheet_rels_path and sheet_rels_path in zf.namelist():
-                rels_root = etree.fromstring(zf.read(sheet_rels_path))
-                rels_ns = {'r': 'http://schemas.openxmlformats.org/package/2006/relationships'}
-                for rel in rels_root.xpath('.//r:Relationship', namespaces=rels_ns):
-                    typ = rel.get('Type')
-                    if typ and typ.endswith('/hyperlink'):
-                        id_to_link[rel.get('Id')] = rel.get('Target')
-                    if typ and typ.endswith('/comments'):
-                        comments_target = rel.get('Target')  # e.g., ../comments1.xml
-        except Exception:
-            pass
+    zf = ctx.zf
+    # Parse relationships to resolve hyperlinks and comments
+    id_to_link: Dict[str, str] = {}
+    comments_target: Optional[str] = None
+    try:
+        if sheet_rels_path and sheet_rels_path in ctx.names:
+            rels_root = load_xml(zf.read(sheet_rels_path))
+            for rel in _xpath('.//pr:Relationship')(rels_root):
+                typ = rel.get('Type')
+                if typ in HYPERLINK_REL_TYPES:
+                    id_to_link[rel.get('Id')] = rel.get('Target')
+                elif typ in COMMENTS_REL_TYPES:
+                    comments_target = rel.get('Target')  # e.g., ../comments1.xml
+    except Exception:
+        pass
 
-        # Normalize comments target to absolute zip path
-        if comments_target:
-            target_path = comments_target
-            if target_path.startswith('../'):
-                target_path = 'xl/' + target_path.replace('../', '')
-            elif not target_path.startswith('xl/'):
-                target_path = 'xl/' + target_path
-            try:
-                if target_path in zf.namelist():
-                    com_root = etree.fromstring(zf.read(target_path))
-                    ns_c = {'c': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
-                    # Some comments parts may not use the namespace prefix; use local-names
-                    for cmt in com_root.xpath('.//comment') + com_root.xpath('.//c:comment', namespaces=ns_c):
-                        ref = cmt.get('ref')
-                        if not ref:
-                            continue
-                        # Concatenate text nodes under comment/text
-                        texts = []
-                        for t in cmt.xpath('.//text//t') + cmt.xpath('.//c:text//c:t', namespaces=ns_c):
+    # Normalize comments target to absolute zip path
+    if comments_target:
+        target_path = comments_target
+        if target_path.startswith('../'):
+            target_path = 'xl/' + target_path.replace('../', '')
+        elif not target_path.startswith('xl/'):
+            target_path = 'xl/' + target_path
+        try:
+            if target_path in ctx.names:
+                com_root = load_xml(zf.read(target_path))
+                main_ns = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+                # Some comments parts may not use the namespace prefix; match both
+                # forms in a single walk instead of one pass per form
+                for cmt in com_root.iter(f'{main_ns}comment', 'comment'):
+                    ref = cmt.get('ref')
+                    if not ref:
+                        continue
+                    # Concatenate text nodes under comment/text
+                    texts = []
+                    for text_el in cmt.iter(f'{main_ns}text', 'text'):
+                        for t in text_el.iter(f'{main_ns}t', 't'):
                             if t.text:
                                 texts.append(t.text)
-                        if texts:
-                            comments[ref] = ''.join(texts)
-            except Exception:
-                pass
-
-        # Parse sheet XML for formulas and hyperlink refs
-        try:
-            if sheet_xml_path and sheet_xml_path in zf.namelist():
-                sh_root = etree.fromstring(zf.read(sheet_xml_path))
-                ns = {'a': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
-                # Formulas: cell c with f child
-                for c in sh_root.xpath('.//a:sheetData/a:row/a:c[a:f]', namespaces=ns):
-                    addr = c.get('r')
-                    f_el = c.find('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}f')
-                    if addr and f_el is not None and f_el.text:
-                        formulas[addr] = '=' + f_el.text
-                # Hyperlinks section
-                for h in sh_root.xpath('.//a:hyperlinks/a:hyperlink', namespaces=ns):
-                    ref = h.get('ref')
-                    r_id = h.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id')
-                    location = h.get('location')
-                    target = None
-                    if r_id and r_id in id_to_link:
-                        target = id_to_link[r_id]
-                    elif location:
-                        target = f"#{location}"
-                    if ref and target:
-                        # Expand ranges like A1:B3 to all cells
-                        try:
-                            min_col, min_row, max_col, max_row = range_boundaries(ref)
-                            for rr in range(min_row, max_row + 1):
-                                for cc in range(min_col, max_col + 1):
-                                    addr = f"{get_column_letter(cc)}{rr}"
-                                    hyperlinks[addr] = target
-                        except Exception:
-                            # Single cell like A1
-                            hyperlinks[ref] = target
+                    if texts:
+                        comments[ref] = ''.join(texts)
         except Exception:
             pass
 
+    # Stream sheet XML for formulas and hyperlink refs; each element is cleared once
+    # handled so peak memory stays flat regardless of sheet size
+    try:
+        if sheet_xml_path and sheet_xml_path in ctx.names:
+            from lxml import etree
+
+            main_ns = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+            c_tag, row_tag, link_tag, f_tag = f'{main_ns}c', f'{main_ns}row', f'{main_ns}hyperlink', f'{main_ns}f'
+            with zf.open(sheet_xml_path, 'r') as sheet_stream:
+                events = etree.iterparse(
+                    sheet_stream,
+                    events=('end',),
+                    tag=(c_tag, row_tag, link_tag),
+                    resolve_entities=False,
+                    no_network=True,
+                    collect_ids=False,
+                )
+                for _, elem in events:
+                    tag = elem.tag
+                    if tag == c_tag:
+                        # Formulas: cell c with f child
+                        f_el = elem.find(f_tag)
+                        addr = elem.get('r')
+                        if addr and f_el is not None and f_el.text:
+                            formulas[addr] = '=' + f_el.text
+                    elif tag == link_tag:
+                        ref = elem.get('ref')
+                        r_id = elem.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id')
+                        location = elem.get('location')
+                        target = None
+                        if r_id and r_id in id_to_link:
+                            target = id_to_link[r_id]
+                        elif location:
+                            target = f"#{location}"
+                        if ref and target:
+                            # Expand ranges like A1:B3 to all cells
+                            try:
+                                min_col, min_row, max_col, max_row = range_boundaries(ref)
+                                letters = [get_column_letter(cc) for cc in range(min_col, max_col + 1)]
+                                hyperlinks.update(dict.fromkeys(
+                                    (f"{letter}{rr}" for rr in range(min_row, max_row + 1) for letter in letters),
+                                    target,
+                                ))
+                            except Exception:
+                                # Single cell like A1
+                                hyperlinks[ref] = target
+                    # Release the handled element and any already-processed siblings
+                    elem.clear(keep_tail=True)
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+    except Exception:
+        pass
+
     return formulas, hyperlinks, comments
 
 
+def _parse_sheet_meta_maps_worker(ctx: WorkbookContext, sheet_xml_path: str, sheet_rels_path: str) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+    # Thread-pool entry point: every task reads through its own zip handle
+    with ctx.reopen() as worker_ctx:
+        return parse_sheet_meta_maps(worker_ctx, sheet_xml_path, sheet_rels_path)
+
+
 # -----------------------------
 # Visual export (xlwings/Excel for Mac)
 # -----------------------------
 
+# Shape-aware print area per (workbook path, sheet name): export_sheet_visuals_mac asks for it
+# once per export path, and each computation walks every shape over Apple Events
+_print_area_cache: Dict[Tuple[str, str], Tuple[int, int, int, int]] = {}
+
+
 def compute_print_area_including_shapes(sht) -> Tuple[int, int, int, int]:
+    try:
+        key = (str(sht.book.fullname), sht.name)
+    except Exception:
+        return _compute_print_area_including_shapes(sht)
+    area = _print_area_cache.get(key)
+    if area is None:
+        area = _print_area_cache[key] = _compute_print_area_including_shapes(sht)
+    return area
+
+
+def _compute_print_area_including_shapes(sht) -> Tuple[int, int, int, int]:
     # Compute using cross-platform xlwings Range API (works on macOS)
     try:
         used = sht.used_range  # xlwings Range
@@ -484,77 +789,71 @@ def set_single_page_pagesetup(sht, r1: int, c1: int, r2: int, c2: int) -> None:
         logger.warning(f"Page setup via wrapper failed: {e}")
 
 
-def export_sheet_visuals_python_fallback(values_ws, sheet_name: str, pdf_out: Path, png_out: Path) -> bool:
-    """Export sheet as whole-sheet PDF/PNG using Python rendering (openpyxl + matplotlib)"""
+# Rendered sheet PNGs only feed the PDF wrapper and OCR; zlib level 1 encodes large
+# canvases several times faster than Pillow's default of 6 for a modestly bigger file
+_CANVAS_PNG_COMPRESS_LEVEL = 1
+
+
+def _load_render_font(image_font, size: int):
+    # Pillow's built-in bitmap font has no Vietnamese/CJK glyphs; prefer a Unicode TrueType font
+    for name in ("Arial Unicode.ttf", "DejaVuSans.ttf", "Arial.ttf"):
+        try:
+            return image_font.truetype(name, size)
+        except OSError:
+            continue
+    return image_font.load_default()
+
+
+def export_sheet_visuals_python_fallback(values_ws, sheet_name: str, pdf_out: Optional[Path], png_out: Path) -> bool:
+    """Export sheet as whole-sheet PDF/PNG using Python rendering (openpyxl + Pillow).
+    With pdf_out=None only the PNG is written and the caller converts it.
+    """
     logger.info(f"Exporting visuals via Python rendering for sheet: {sheet_name}")
     start_time = time.time()
     
     try:
-        import matplotlib.pyplot as plt
-        import matplotlib.patches as patches
-        from matplotlib.backends.backend_pdf import PdfPages
-        import numpy as np
+        from PIL import Image, ImageDraw, ImageFont
         
         # Get sheet dimensions
         max_row = max(values_ws.max_row or 1, 1)
         max_col = max(values_ws.max_column or 1, 1)
         
-        # Create figure with appropriate size (A4-like proportions)
-        fig_width = max(8.5, max_col * 0.8)  # ~0.8 inches per column
-        fig_height = max(11, max_row * 0.2)  # ~0.2 inches per row
-        fig, ax = plt.subplots(figsize=(fig_width, fig_height))
+        # Pixel grid from column widths / row heights
+        col_edges, row_edges, grid_w, grid_h = _canvas_geometry(values_ws, 1, 1, max_row, max_col)
+        width, height = grid_w + 1, grid_h + 1
         
-        # Set up the plot area
-        ax.set_xlim(0, max_col)
-        ax.set_ylim(0, max_row)
-        ax.set_aspect('equal')
-        ax.invert_yaxis()  # Excel-style: row 1 at top
+        canvas = Image.new('RGB', (width, height), 'white')
+        draw = ImageDraw.Draw(canvas)
         
         # Draw grid
-        for i in range(max_col + 1):
-            ax.axvline(x=i, color='lightgray', linewidth=0.5)
-        for i in range(max_row + 1):
-            ax.axhline(y=i, color='lightgray', linewidth=0.5)
+        for x in col_edges:
+            draw.line([(x, 0), (x, height - 1)], fill='lightgray', width=1)
+        for y in row_edges:
+            draw.line([(0, y), (width - 1, y)], fill='lightgray', width=1)
         
-        # Fill cells with data
-        for row in range(1, max_row + 1):
-            for col in range(1, max_col + 1):
-                try:
-                    cell = values_ws.cell(row=row, column=col)
-                    if cell.value is not None:
-                        # Draw cell background
-                        rect = patches.Rectangle(
-                            (col-1, row-1), 1, 1,
-                            linewidth=0.5, edgecolor='black',
-                            facecolor='white', alpha=0.8
-                        )
-                        ax.add_patch(rect)
-                        
-                        # Add text (truncate if too long)
-                        text = str(cell.value)[:20] + "..." if len(str(cell.value)) > 20 else str(cell.value)
-                        ax.text(col-0.5, row-0.5, text, 
-                               ha='center', va='center', fontsize=8, wrap=True)
-                except Exception:
+        # Fill cells with data in a single row stream
+        font = _load_render_font(ImageFont, 11)
+        rows = values_ws.iter_rows(min_row=1, max_row=max_row, min_col=1, max_col=max_col, values_only=True)
+        for row, row_values in enumerate(rows, start=1):
+            y0, y1 = row_edges[row - 1], row_edges[row]
+            for col, value in enumerate(row_values, start=1):
+                if value is None:
                     continue
+                x0, x1 = col_edges[col - 1], col_edges[col]
+                # Draw cell border
+                draw.rectangle([x0, y0, x1, y1], outline='black', fill='white')
+                # Add text (truncate if too long)
+                value_str = str(value)
+                text = value_str[:20] + "..." if len(value_str) > 20 else value_str
+                draw.text(((x0 + x1) / 2, (y0 + y1) / 2), text, fill='black', font=font, anchor='mm')
         
-        # Remove axes
-        ax.set_xticks([])
-        ax.set_yticks([])
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['bottom'].set_visible(False)
-        ax.spines['left'].set_visible(False)
-        
-        # Save as PDF (whole sheet)
-        logger.info(f"Exporting PDF to {pdf_out.name}")
-        with PdfPages(pdf_out) as pdf:
-            pdf.savefig(fig, bbox_inches='tight', pad_inches=0.1)
-        
-        # Save as PNG (whole sheet)
+        # Save as PNG (whole sheet), then wrap it as a single-page PDF
         logger.info(f"Exporting PNG to {png_out.name}")
-        fig.savefig(png_out, dpi=300, bbox_inches='tight', pad_inches=0.1)
-        
-        plt.close(fig)
+        canvas.save(png_out, format='PNG', compress_level=_CANVAS_PNG_COMPRESS_LEVEL)
+        if pdf_out is not None:
+            logger.info(f"Exporting PDF to {pdf_out.name}")
+            if not _png_to_pdf(png_out, pdf_out):
+                return False
         
         elapsed = time.time() - start_time
         logger.info(f"Python visual export completed in {elapsed:.2f}s")
@@ -565,6 +864,116 @@ def export_sheet_visuals_python_fallback(values_ws, sheet_name: str, pdf_out: Pa
         return False
 
 
+# Persistent AppleScript host: one `osascript -l JavaScript` process executes every
+# AppleScript snippet through NSAppleScript, so each helper call avoids a fresh
+# osascript fork/exec. Requests and replies are single base64 lines on stdin/stdout.
+_OSA_HOST_JS = r'''
+ObjC.import('Foundation');
+function run() {
+  var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+  var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+  var emit = function (line) {
+    stdout.writeData($(line + '\n').dataUsingEncoding($.NSUTF8StringEncoding));
+  };
+  var pending = '';
+  while (true) {
+    var data = stdin.availableData;
+    if (data.length === 0) { return ''; }
+    pending += $.NSString.alloc.initWithDataEncoding(data, $.NSASCIIStringEncoding).js;
+    var nl;
+    while ((nl = pending.indexOf('\n')) !== -1) {
+      var line = pending.slice(0, nl);
+      pending = pending.slice(nl + 1);
+      var raw = $.NSData.alloc.initWithBase64EncodedStringOptions($(line), 0);
+      var source = $.NSString.alloc.initWithDataEncoding(raw, $.NSUTF8StringEncoding);
+      var err = Ref();
+      var desc = $.NSAppleScript.alloc.initWithSource(source).executeAndReturnError(err);
+      if (desc.isNil()) { emit('ERR'); continue; }
+      var text = desc.stringValue.isNil() ? '' : desc.stringValue.js;
+      emit('OK ' + $(text).dataUsingEncoding($.NSUTF8StringEncoding).base64EncodedStringWithOptions(0).js);
+    }
+  }
+}
+'''
+
+_osa_host_proc: Optional[subprocess.Popen] = None
+_osa_host_lock = threading.Lock()
+
+
+def _osa_host_close() -> None:
+    global _osa_host_proc
+    proc, _osa_host_proc = _osa_host_proc, None
+    if proc is None:
+        return
+    try:
+        proc.stdin.close()
+        proc.wait(timeout=1)
+    except Exception:
+        proc.kill()
+
+
+atexit.register(_osa_host_close)
+
+
+def _osa_host() -> subprocess.Popen:
+    global _osa_host_proc
+    if _osa_host_proc is None or _osa_host_proc.poll() is not None:
+        _osa_host_proc = subprocess.Popen(
+            ["osascript", "-l", "JavaScript", "-e", _OSA_HOST_JS],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0,
+        )
+    return _osa_host_proc
+
+
+def _osa_read_line(stream, timeout: float) -> Optional[bytes]:
+    deadline = _time.time() + timeout
+    buf = b""
+    while not buf.endswith(b"\n"):
+        remaining = deadline - _time.time()
+        if remaining <= 0 or not select.select([stream], [], [], remaining)[0]:
+            return None
+        chunk = os.read(stream.fileno(), 65536)
+        if not chunk:
+            return None
+        buf += chunk
+    return buf.rstrip(b"\n")
+
+
+def _osa_run_once(script: str, timeout: float) -> Optional[str]:
+    try:
+        result = subprocess.run(["osascript", "-e", script], capture_output=True, text=True, timeout=timeout)
+    except Exception:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+def _osa_run(script: str, timeout: float = 5) -> Optional[str]:
+    """Run AppleScript source and return its result as stripped text, or None on error/timeout."""
+    # The snippet runs inside a handler so its `return` values are coerced to text
+    wrapped = f"on __osa_main()\n{script}\nend __osa_main\nreturn (__osa_main() as text)"
+    payload = base64.b64encode(wrapped.encode("utf-8")) + b"\n"
+    with _osa_host_lock:
+        try:
+            host = _osa_host()
+        except OSError:
+            # Host could not be started; run this snippet the one-shot way
+            return _osa_run_once(script, timeout)
+        try:
+            host.stdin.write(payload)
+            line = _osa_read_line(host.stdout, timeout)
+        except Exception:
+            line = None
+        if line is None:
+            # Hung or died mid-script: drop it so the next call gets a fresh host
+            _osa_host_close()
+            return None
+    if not line.startswith(b"OK "):
+        return None
+    return base64.b64decode(line[3:]).decode("utf-8").strip()
+
+
 def _applescript_get_excel_window_bounds() -> Optional[Tuple[int, int, int, int]]:
     """Return (x, y, w, h) of the front Excel window via AppleScript/System Events."""
     script = (
@@ -579,10 +988,7 @@ def _applescript_get_excel_window_bounds() -> Optional[Tuple[int, int, int, int]
         'end tell'
     )
     try:
-        result = subprocess.run(["osascript", "-e", script], capture_output=True, text=True, timeout=5)
-        if result.returncode != 0:
-            return None
-        out = result.stdout.strip()
+        out = _osa_run(script, timeout=5)
         if not out:
             return None
         parts = out.split(",")
@@ -636,10 +1042,7 @@ def _applescript_get_excel_window_id() -> Optional[int]:
         'end tell'
     )
     try:
-        result = subprocess.run(["osascript", "-e", script], capture_output=True, text=True, timeout=5)
-        if result.returncode != 0:
-            return None
-        out = result.stdout.strip()
+        out = _osa_run(script, timeout=5)
         if not out:
             return None
         return int(out)
@@ -689,11 +1092,7 @@ def _copy_picture_menu_to_clipboard() -> bool:
         '  end tell\n'
         'end tell'
     )
-    try:
-        result = subprocess.run(["osascript", "-e", script], capture_output=True, text=True, timeout=5)
-        return result.returncode == 0 and result.stdout.strip() == 'true'
-    except Exception:
-        return False
+    return _osa_run(script, timeout=5) == 'true'
 
 
 def _save_clipboard_image_to_png(png_out: Path) -> bool:
@@ -702,7 +1101,7 @@ def _save_clipboard_image_to_png(png_out: Path) -> bool:
         grab = ImageGrab.grabclipboard()
         if grab is None:
             return False
-        grab.save(png_out, format='PNG')
+        grab.save(png_out, format='PNG', compress_level=_CANVAS_PNG_COMPRESS_LEVEL)
         return png_out.exists()
     except Exception:
         return False
@@ -730,8 +1129,8 @@ def excel_zoom_fit_selection(sheet_name: str) -> bool:
           end try
         end tell
         '''
-        res = subprocess.run(["osascript", "-e", osa], capture_output=True, text=True, timeout=6)
-        return res.returncode == 0 and "OK" in (res.stdout or "")
+        res = _osa_run(osa, timeout=6)
+        return res is not None and "OK" in res
     except Exception:
         return False
 
@@ -756,6 +1155,34 @@ def _row_height_to_pixels(row_height: Optional[float]) -> int:
         return 20
 
 
+def _pixel_offsets(values_ws, r1: int, c1: int, r2: int, c2: int) -> Tuple[List[int], List[int]]:
+    """Prefix sums of column widths / row heights in px: offsets[i] is the left/top edge of column c1+i / row r1+i."""
+    from openpyxl.utils import get_column_letter
+
+    # Read-only worksheets carry no dimension holders; fall back to default sizes
+    col_dims = getattr(values_ws, 'column_dimensions', None) or {}
+    row_dims = getattr(values_ws, 'row_dimensions', None) or {}
+    # Bound once: the loops below run per column/row of the area on every sheet
+    col_get, row_get = col_dims.get, row_dims.get
+    c2px, r2px = _col_width_to_pixels, _row_height_to_pixels
+    widths: List[int] = []
+    for c in range(c1, c2 + 1):
+        cd = col_get(get_column_letter(c))
+        widths.append(c2px(getattr(cd, 'width', None) if cd is not None else None))
+    heights: List[int] = []
+    for r in range(r1, r2 + 1):
+        rd = row_get(r)
+        heights.append(r2px(getattr(rd, 'height', None) if rd is not None else None))
+    return list(accumulate(widths, initial=0)), list(accumulate(heights, initial=0))
+
+
+# Canvas offsets are reused across render passes over the same area; cleared per workbook run
+@lru_cache(maxsize=64)
+def _canvas_geometry(values_ws, r1: int, c1: int, r2: int, c2: int) -> Tuple[Tuple[int, ...], Tuple[int, ...], int, int]:
+    col_offsets, row_offsets = _pixel_offsets(values_ws, r1, c1, r2, c2)
+    return tuple(col_offsets), tuple(row_offsets), col_offsets[-1], row_offsets[-1]
+
+
 def _emu_to_px(emu: Optional[int]) -> int:
     if not emu:
         return 0
@@ -765,19 +1192,70 @@ def _emu_to_px(emu: Optional[int]) -> int:
         return 0
 
 
-def export_sheet_visuals_overlay_from_drawing(values_ws, sheet_name: str, xlsx_path: Path, pdf_out: Path, png_out: Path, area: Optional[Tuple[int, int, int, int]] = None) -> bool:
+def _resize_to_box(img, box_w: int, box_h: int):
+    # BOX for >=2x downscales (area average, cheapest), BILINEAR otherwise, no-op when
+    # already box-sized; Pillow-SIMD accelerates both filters as a drop-in replacement
+    if img.size == (box_w, box_h):
+        return img
+    from PIL import Image
+
+    filters = getattr(Image, 'Resampling', Image)  # Pillow < 9.1 keeps the constants on Image
+    if img.width >= 2 * box_w and img.height >= 2 * box_h:
+        resample = filters.BOX
+    else:
+        resample = filters.BILINEAR
+    return img.resize((box_w, box_h), resample=resample)
+
+
+def _drawing_image_rels(ctx: WorkbookContext, rels_path: str) -> Dict[str, str]:
+    # r:id -> zip path of each image relationship in a drawing's rels part, parsed once per workbook
+    rels_map = ctx.drawing_rels.get(rels_path)
+    if rels_map is not None:
+        return rels_map
+    rels_map = {}
+    if rels_path in ctx.names:
+        with ctx.zf.open(rels_path) as rels_stream:
+            for rel in iterparse_cleared(rels_stream, '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'):
+                if rel.get('Type') in IMAGE_REL_TYPES:
+                    rels_map[rel.get('Id')] = rel.get('Target').replace('../', 'xl/')
+    ctx.drawing_rels[rels_path] = rels_map
+    return rels_map
+
+
+def _decode_media_to_box(job: Tuple[str, bytes, int, int, int, int]):
+    # Overlay decode worker: (resized image, has_alpha) for one placement, or None if undecodable
+    from PIL import Image
+
+    media_path, data, _, _, box_w, box_h = job
+    try:
+        img = Image.open(io.BytesIO(data))
+        if img.format == 'JPEG':
+            # Let libjpeg decode at a reduced DCT scale (still >= 2x the box)
+            img.draft('RGB', (box_w * 2, box_h * 2))
+        # Only images with transparency need the RGBA conversion and masked paste
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        return _resize_to_box(img, box_w, box_h), has_alpha
+    except Exception as e:
+        logger.warning(f"Failed to place media {media_path}: {e}")
+        return None
+
+
+def export_sheet_visuals_overlay_from_drawing(values_ws, sheet_name: str, xlsx_path: Path, pdf_out: Optional[Path], png_out: Path, area: Optional[Tuple[int, int, int, int]] = None, ctx: Optional[WorkbookContext] = None) -> bool:
     """Reconstruct a visual by overlaying images from DrawingML anchors onto a canvas sized to the sheet area.
     This includes SmartArt/images/charts as rendered images, but not cell text.
+    Pass the pipeline's open `ctx` to reuse its zip handle; otherwise one is opened for this call.
+    With pdf_out=None only the PNG is written and the caller converts it.
     """
     logger.info(f"Exporting visuals via DrawingML overlay for sheet: {sheet_name}")
+    own_ctx: Optional[WorkbookContext] = None
     try:
-        import zipfile
-        from lxml import etree
         from PIL import Image, ImageDraw
-        from openpyxl.utils import get_column_letter
 
         # Determine sheet drawings
-        mapping = map_sheet_to_drawings(xlsx_path)
+        if ctx is None:
+            ctx = own_ctx = open_workbook_context(xlsx_path)
+        mapping = map_sheet_to_drawings(ctx)
         drawings = mapping.get(sheet_name, [])
         if not drawings:
             logger.warning("No drawing parts mapped to sheet; overlay cannot proceed")
@@ -792,73 +1270,49 @@ def export_sheet_visuals_overlay_from_drawing(values_ws, sheet_name: str, xlsx_p
             c2 = max(values_ws.max_column or 1, 1)
 
         # Sum pixel widths/heights across target area
-        total_width_px = 0
-        col_offsets_px: List[int] = [0]
-        for c in range(c1, c2 + 1):
-            key = get_column_letter(c)
-            w_px = _col_width_to_pixels(getattr(values_ws.column_dimensions.get(key, None), 'width', None) if values_ws.column_dimensions and key in values_ws.column_dimensions else None)
-            total_width_px += w_px
-            col_offsets_px.append(total_width_px)
-
-        total_height_px = 0
-        row_offsets_px: List[int] = [0]
-        for r in range(r1, r2 + 1):
-            h_px = _row_height_to_pixels(getattr(values_ws.row_dimensions.get(r, None), 'height', None) if values_ws.row_dimensions and r in values_ws.row_dimensions else None)
-            total_height_px += h_px
-            row_offsets_px.append(total_height_px)
+        col_offsets_px, row_offsets_px, total_width_px, total_height_px = _canvas_geometry(values_ws, r1, c1, r2, c2)
 
         # Create blank white canvas
         canvas = Image.new('RGB', (max(1, total_width_px), max(1, total_height_px)), (255, 255, 255))
         draw = ImageDraw.Draw(canvas)
 
-        with zipfile.ZipFile(xlsx_path, 'r') as zf:
-            for drawing_name in drawings:
-                drawing_path = f"xl/drawings/{drawing_name}"
-                rels_path = f"xl/drawings/_rels/{Path(drawing_name).name}.rels"
-                if drawing_path not in zf.namelist():
-                    continue
-                rels_map: Dict[str, str] = {}
-                if rels_path in zf.namelist():
-                    rels_root = etree.fromstring(zf.read(rels_path))
-                    rels_ns = {'r': 'http://schemas.openxmlformats.org/package/2006/relationships'}
-                    for rel in rels_root.xpath('.//r:Relationship', namespaces=rels_ns):
-                        if rel.get('Type', '').endswith('/image'):
-                            rels_map[rel.get('Id')] = rel.get('Target').replace('../', 'xl/')
-
-                root = etree.fromstring(zf.read(drawing_path))
-                ns = {
-                    'a': 'http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing',
-                    'xdr': 'http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing',
-                    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
-                }
-                # twoCellAnchor holds from/to cells and embedded image via r:embed
-                for anchor in root.xpath('.//xdr:twoCellAnchor', namespaces=ns):
-                    pic = anchor.find('.//xdr:pic', namespaces=ns)
-                    if pic is None:
-                        continue
-                    blip = pic.find('.//a:blip', namespaces={'a': 'http://schemas.openxmlformats.org/drawingml/2006/main'})
-                    if blip is None:
-                        continue
-                    r_id = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
-                    media_path = rels_map.get(r_id)
-                    if not media_path or media_path not in zf.namelist():
+        # Anchor queries are compiled once per call, not re-parsed per anchor
+        xp_pic = _xpath('.//xdr:pic')
+        xp_blip = _xpath('.//dml:blip')
+        xp_coords = _xpath(
+            "concat(xdr:from/xdr:col,'|',xdr:from/xdr:colOff,'|',xdr:from/xdr:row,'|',xdr:from/xdr:rowOff,'|',"
+            "xdr:to/xdr:col,'|',xdr:to/xdr:colOff,'|',xdr:to/xdr:row,'|',xdr:to/xdr:rowOff)"
+        )
+
+        zf = ctx.zf
+        # (media_path, x0, y0, box_w, box_h) per in-area picture, in document order
+        placements: List[Tuple[str, int, int, int, int]] = []
+        for drawing_name in drawings:
+            drawing_path = f"xl/drawings/{drawing_name}"
+            rels_path = f"xl/drawings/_rels/{Path(drawing_name).name}.rels"
+            if drawing_path not in ctx.names:
+                continue
+            # Image rels are only read once a picture anchor lands inside the area, so a
+            # drawing placed entirely outside it never touches its rels part
+            rels_map: Optional[Dict[str, str]] = None
+
+            # twoCellAnchor holds from/to cells and embedded image via r:embed; stream the
+            # anchors instead of building the whole drawing DOM
+            with zf.open(drawing_path) as drawing_stream:
+                for anchor in iterparse_cleared(drawing_stream, '{http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing}twoCellAnchor'):
+                    pics = xp_pic(anchor)
+                    if not pics:
                         continue
 
-                    # from cell
-                    from_node = anchor.find('xdr:from', namespaces=ns)
-                    to_node = anchor.find('xdr:to', namespaces=ns)
-                    if from_node is None or to_node is None:
-                        continue
+                    # from/to cells in one traversal; a missing from/to col or row
+                    # comes back as '' and fails int(), which skips the anchor
                     try:
-                        from_col = int(from_node.find('xdr:col', namespaces=ns).text) + 1
-                        from_colOff = int(from_node.find('xdr:colOff', namespaces=ns).text or '0')
-                        from_row = int(from_node.find('xdr:row', namespaces=ns).text) + 1
-                        from_rowOff = int(from_node.find('xdr:rowOff', namespaces=ns).text or '0')
-
-                        to_col = int(to_node.find('xdr:col', namespaces=ns).text) + 1
-                        to_colOff = int(to_node.find('xdr:colOff', namespaces=ns).text or '0')
-                        to_row = int(to_node.find('xdr:row', namespaces=ns).text) + 1
-                        to_rowOff = int(to_node.find('xdr:rowOff', namespaces=ns).text or '0')
+                        (from_col, from_colOff, from_row, from_rowOff,
+                         to_col, to_colOff, to_row, to_rowOff) = xp_coords(anchor).split('|')
+                        from_col, from_row = int(from_col) + 1, int(from_row) + 1
+                        to_col, to_row = int(to_col) + 1, int(to_row) + 1
+                        from_colOff, from_rowOff = int(from_colOff or '0'), int(from_rowOff or '0')
+                        to_colOff, to_rowOff = int(to_colOff or '0'), int(to_rowOff or '0')
                     except Exception:
                         continue
 
@@ -867,34 +1321,65 @@ def export_sheet_visuals_overlay_from_drawing(values_ws, sheet_name: str, xlsx_p
                         # If image outside area, skip or clamp (here we skip)
                         continue
 
+                    blips = xp_blip(pics[0])
+                    if not blips:
+                        continue
+                    if rels_map is None:
+                        rels_map = _drawing_image_rels(ctx, rels_path)
+                    r_id = blips[0].get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
+                    media_path = rels_map.get(r_id)
+                    if not media_path or media_path not in ctx.names:
+                        continue
+
                     # Position from area origin
                     x0 = col_offsets_px[from_col - c1] + _emu_to_px(from_colOff)
                     y0 = row_offsets_px[from_row - r1] + _emu_to_px(from_rowOff)
                     x1 = col_offsets_px[to_col - c1] + _emu_to_px(to_colOff)
                     y1 = row_offsets_px[to_row - r1] + _emu_to_px(to_rowOff)
+                    placements.append((media_path, x0, y0, max(1, x1 - x0), max(1, y1 - y0)))
 
-                    # Load and paste image scaled to box
+        # Decode/resize on a pool (Pillow's codecs release the GIL) while this thread
+        # pastes; map() keeps document order so later anchors still land on top
+        decode_jobs = []
+        for media_path, x0, y0, box_w, box_h in placements:
+            try:
+                # Read here: ZipFile reads are not thread-safe
+                data = zf.read(media_path)
+            except Exception as e:
+                logger.warning(f"Failed to place media {media_path}: {e}")
+                continue
+            decode_jobs.append((media_path, data, x0, y0, box_w, box_h))
+        if decode_jobs:
+            from concurrent.futures import ThreadPoolExecutor
+
+            workers = min(len(decode_jobs), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="overlay-decode") as pool:
+                for (media_path, _, x0, y0, _, _), decoded in zip(decode_jobs, pool.map(_decode_media_to_box, decode_jobs)):
+                    if decoded is None:
+                        continue
+                    img_resized, has_alpha = decoded
                     try:
-                        with zf.open(media_path) as imgf:
-                            img = Image.open(imgf).convert('RGBA')
-                            box_w = max(1, x1 - x0)
-                            box_h = max(1, y1 - y0)
-                            img_resized = img.resize((box_w, box_h))
-                            canvas.paste(img_resized, (x0, y0), img_resized)
+                        canvas.paste(img_resized, (x0, y0), img_resized if has_alpha else None)
                     except Exception as e:
                         logger.warning(f"Failed to place media {media_path}: {e}")
 
         # Save outputs
-        canvas.save(png_out, format='PNG')
-        _png_to_pdf(png_out, pdf_out)
+        canvas.save(png_out, format='PNG', compress_level=_CANVAS_PNG_COMPRESS_LEVEL)
+        if pdf_out is not None:
+            _png_to_pdf(png_out, pdf_out)
         logger.info("DrawingML overlay export completed (PNG first → PDF)")
         return True
     except Exception as e:
         logger.warning(f"DrawingML overlay export failed: {e}")
         return False
+    finally:
+        if own_ctx is not None:
+            own_ctx.close()
 
 
-def export_sheet_visuals_mac(sht, pdf_out: Path, png_out: Path, values_ws=None) -> None:
+def export_sheet_visuals_mac(sht, pdf_out: Path, png_out: Path, values_ws=None, ctx: Optional[WorkbookContext] = None, io_pool=None) -> Optional["concurrent.futures.Future"]:
+    # With an io_pool, the overlay/Python fallbacks only write the PNG and the PNG→PDF
+    # conversion is submitted to the pool; the returned future must be waited on
     from openpyxl.utils import get_column_letter
 
     logger.info(f"Exporting visuals for sheet: {sht.name}")
@@ -902,10 +1387,11 @@ def export_sheet_visuals_mac(sht, pdf_out: Path, png_out: Path, values_ws=None)
     
     excel_success = False
     screenshot_success = False
+    defer_pdf = io_pool is not None
+    pdf_pending = False
 
     # 1) Preferred: Use Excel's Copy Picture… via UI scripting and clipboard capture
     try:
-        from openpyxl.utils import get_column_letter
         logger.info("Attempting Copy Picture via UI and clipboard (preferred)")
         # Compute shape-aware print area and select it
         r1, c1, r2, c2 = compute_print_area_including_shapes(sht)
@@ -929,7 +1415,6 @@ def export_sheet_visuals_mac(sht, pdf_out: Path, png_out: Path, values_ws=None)
     # 2) If Copy Picture fails, try AppleScript screenshot of active Excel window
     if not screenshot_success:
         try:
-            from openpyxl.utils import get_column_letter
             # Ensure selection and zoom before screenshot too
             r1s, c1s, r2s, c2s = compute_print_area_including_shapes(sht)
             a1s = f"${get_column_letter(c1s)}${r1s}:${get_column_letter(c2s)}${r2s}"
@@ -1019,19 +1504,20 @@ def export_sheet_visuals_mac(sht, pdf_out: Path, png_out: Path, values_ws=None)
             r1o, c1o, r2o, c2o = compute_print_area_including_shapes(sht)
             xlsx_path = Path(sht.book.fullname)
             if values_ws is not None:
-                overlay_ok = export_sheet_visuals_overlay_from_drawing(values_ws, sht.name, xlsx_path, pdf_out, png_out, (r1o, c1o, r2o, c2o))
+                overlay_ok = export_sheet_visuals_overlay_from_drawing(values_ws, sht.name, xlsx_path, None if defer_pdf else pdf_out, png_out, (r1o, c1o, r2o, c2o), ctx)
             else:
                 overlay_ok = False
+            pdf_pending = defer_pdf and overlay_ok
             screenshot_success = screenshot_success or overlay_ok
         except Exception as e:
             logger.warning(f"DrawingML overlay path failed: {e}")
 
     # Final fallback: Python rendering of cells only
-    if not screenshot_success or not pdf_out.exists() or not png_out.exists():
+    if not screenshot_success or not (pdf_pending or pdf_out.exists()) or not png_out.exists():
         logger.info("Falling back to Python cell rendering for visual export")
         try:
             if values_ws is not None:
-                export_sheet_visuals_python_fallback(values_ws, sht.name, pdf_out, png_out)
+                pdf_pending = export_sheet_visuals_python_fallback(values_ws, sht.name, None if defer_pdf else pdf_out, png_out) and defer_pdf
             else:
                 logger.warning("No values worksheet available for Python fallback")
         except Exception as e:
@@ -1039,25 +1525,59 @@ def export_sheet_visuals_mac(sht, pdf_out: Path, png_out: Path, values_ws=None)
     
     elapsed = time.time() - start_time
     logger.info(f"Visual export completed in {elapsed:.2f}s")
+    if pdf_pending:
+        logger.info(f"Queued PDF conversion for {png_out.name}")
+        return io_pool.submit(_png_to_pdf, png_out, pdf_out)
+    return None
 
 
 # -----------------------------
 # OCR (optional)
 # -----------------------------
 
+# tesserocr drives libtesseract in-process; one API per thread (the io pool runs OCR
+# concurrently and PyTessBaseAPI is not thread-safe) so traineddata is loaded once
+_ocr_local = threading.local()
+
+
+def _tesserocr_api():
+    api = getattr(_ocr_local, "api", None)
+    if api is None:
+        import tesserocr
+
+        api = _ocr_local.api = tesserocr.PyTessBaseAPI()
+    return api
+
+
 def run_ocr_if_enabled(png_path: Path, ocr_out: Path) -> None:
     logger.info(f"Running OCR on {png_path.name}")
     start_time = time.time()
     
     try:
-        import pytesseract
         from PIL import Image
     except Exception:
         logger.warning("OCR dependencies not available")
         return
 
     try:
-        text = pytesseract.image_to_string(Image.open(png_path))
+        api = _tesserocr_api()
+        pytesseract = None
+    except Exception:
+        # No tesserocr/libtesseract binding: fall back to the tesseract subprocess
+        try:
+            import pytesseract
+        except Exception:
+            logger.warning("OCR dependencies not available")
+            return
+        api = None
+
+    try:
+        with Image.open(png_path) as img:
+            if api is not None:
+                api.SetImage(img)
+                text = api.GetUTF8Text()
+            else:
+                text = pytesseract.image_to_string(img)
         ocr_out.write_text(text, encoding="utf-8")
         elapsed = time.time() - start_time
         logger.info(f"OCR completed in {elapsed:.2f}s ({len(text)} characters)")
@@ -1071,7 +1591,57 @@ def run_ocr_if_enabled(png_path: Path, ocr_out: Path) -> None:
 # Main pipeline
 # -----------------------------
 
-def preprocess_workbook(xlsx_path: Path, out_dir: Path, num_sheets: int, enable_ocr: bool) -> None:
+def write_sheet_json(ctx: WorkbookContext, values_ws, job: Dict, workbook_id: str, images: List[Dict], extract_cells: bool, meta: Optional[Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]] = None) -> None:
+    # Structured extraction + per-sheet JSON for one job built by preprocess_workbook
+    ws_name = job['sheet_name']
+    if extract_cells:
+        if meta is None:
+            meta = parse_sheet_meta_maps(ctx, job['sheet_xml'], job['sheet_rels'])
+        formulas_map, hyperlinks_map, comments_map = meta
+        cells, links_to = extract_sheet_structured(values_ws, ws_name, formulas_map, hyperlinks_map, comments_map)
+    else:
+        # Drawings/visuals only: skip the per-cell scan entirely
+        cells, links_to = SheetCells(), []
+    named_ranges_all = parse_defined_names_from_workbook(ctx)
+
+    sheet_obj = ExtractedSheet(
+        workbook_id=workbook_id,
+        sheet_index=job['sheet_index'],
+        sheet_name=ws_name,
+        cells=cells,
+        named_ranges=named_ranges_all,
+        images=images,
+        smartart_drawings=job['smartart_drawings'],
+        assets=job['assets'],
+        links_to=links_to,
+    )
+
+    # Write per-sheet JSON
+    logger.info(f"Writing JSON for sheet: {ws_name}")
+    write_json(Path(job['json_path']), sheet_obj.__dict__)
+
+
+# Per-process state for --workers > 1: each worker opens the workbook once
+_sheet_worker: Dict[str, object] = {}
+
+
+def _sheet_worker_init(xlsx_path: str, workbook_id: str, images: List[Dict], extract_cells: bool) -> None:
+    path = Path(xlsx_path)
+    _sheet_worker.update(
+        values_wb=load_values_workbook(path),
+        ctx=open_workbook_context(path),
+        workbook_id=workbook_id,
+        images=images,
+        extract_cells=extract_cells,
+    )
+
+
+def _sheet_worker_run(job: Dict) -> None:
+    st = _sheet_worker
+    write_sheet_json(st['ctx'], st['values_wb'][job['sheet_name']], job, st['workbook_id'], st['images'], st['extract_cells'])
+
+
+def preprocess_workbook(xlsx_path: Path, out_dir: Path, num_sheets: int, enable_ocr: bool, extract_cells: bool = True, workers: int = 1) -> None:
     logger.info("=" * 60)
     logger.info("EXCEL PREPROCESSING PIPELINE STARTED")
     logger.info("=" * 60)
@@ -1079,6 +1649,8 @@ def preprocess_workbook(xlsx_path: Path, out_dir: Path, num_sheets: int, enable_
     logger.info(f"Output: {out_dir}")
     logger.info(f"Processing first {num_sheets} sheets")
     logger.info(f"OCR enabled: {enable_ocr}")
+    logger.info(f"Cell extraction enabled: {extract_cells}")
+    logger.info(f"Sheet workers: {workers}")
     
     pipeline_start = time.time()
     
@@ -1106,60 +1678,112 @@ def preprocess_workbook(xlsx_path: Path, out_dir: Path, num_sheets: int, enable_
     workbook_id = compute_sha256(xlsx_path)
 
     # Load workbook for values only (fast)
-    from openpyxl import __version__ as openpyxl_version  # noqa: F401
     values_wb = load_values_workbook(xlsx_path)
 
-    # Extract media/drawings (global)
-    images_global, drawing_files_global = extract_media_and_drawings(xlsx_path, extracted_media_dir, extracted_drawings_dir)
-    sheet_to_drawings = {}
+    # Everything opened from here on is released in the finally below, even when
+    # media/drawing extraction or Excel startup fails
+    ctx = None
+    app = None
+    wb_xlw = None
+    meta_pool = None
+    sheet_pool = None
+    io_pool = None
     try:
-        logger.info("Mapping sheets to drawings")
-        sheet_to_drawings = map_sheet_to_drawings(xlsx_path)
-        logger.info(f"Mapped {len(sheet_to_drawings)} sheets to drawings")
-    except Exception as e:
-        logger.warning(f"Could not map sheets to drawings: {e}")
-        sheet_to_drawings = {}
-
-    # Manifest structure
-    manifest = {
-        "workbook": str(xlsx_path),
-        "workbook_id": workbook_id,
-        "created_at": int(time.time()),
-        "sheets": [],
-        "extracted": {
-            "media_dir": str(extracted_media_dir),
-            "drawings_dir": str(extracted_drawings_dir),
-        },
-    }
+        # Open the .xlsx zip once; workbook.xml and its rels are parsed here and shared
+        ctx = open_workbook_context(xlsx_path)
 
-    # Iterate sheets (first N visible worksheets)
-    processed = 0
-    ordered_info, _ = get_ordered_sheet_info(xlsx_path)
+        # Extract media/drawings (global)
+        images_global, drawing_files_global = extract_media_and_drawings(ctx, extracted_media_dir, extracted_drawings_dir)
+        sheet_to_drawings = {}
+        try:
+            logger.info("Mapping sheets to drawings")
+            sheet_to_drawings = map_sheet_to_drawings(ctx)
+            logger.info(f"Mapped {len(sheet_to_drawings)} sheets to drawings")
+        except Exception as e:
+            logger.warning(f"Could not map sheets to drawings: {e}")
+            sheet_to_drawings = {}
+
+        # Manifest structure
+        manifest = {
+            "workbook": str(xlsx_path),
+            "workbook_id": workbook_id,
+            "created_at": int(time.time()),
+            "sheets": [],
+            "extracted": {
+                "media_dir": str(extracted_media_dir),
+                "drawings_dir": str(extracted_drawings_dir),
+            },
+        }
 
-    # Visual export via Excel only if available
-    can_visual = True
-    try:
-        import xlwings as xw  # noqa: F401
-        logger.info("xlwings available - visual export enabled")
-    except Exception:
-        logger.warning("xlwings not available - visual export disabled")
-        can_visual = False
+        # Iterate sheets (first N visible worksheets)
+        processed = 0
+        ordered_info, _ = get_ordered_sheet_info(ctx)
 
-    app = None
-    wb_xlw = None
-    if can_visual:
-        logger.info("Opening Excel for visual export")
-        import xlwings as xw
-        app = xw.App(visible=False, add_book=False)
+        # Visual export via Excel only if available
+        can_visual = True
         try:
-            wb_xlw = app.books.open(str(xlsx_path))
-            logger.info("Excel workbook opened successfully")
-        except Exception as e:
-            logger.warning(f"Could not open Excel workbook: {e}")
-            wb_xlw = None
+            import xlwings as xw  # noqa: F401
+            logger.info("xlwings available - visual export enabled")
+        except Exception:
+            logger.warning("xlwings not available - visual export disabled")
             can_visual = False
 
-    try:
+        if can_visual:
+            logger.info("Opening Excel for visual export")
+            import xlwings as xw
+            app = xw.App(visible=False, add_book=False)
+            try:
+                wb_xlw = app.books.open(str(xlsx_path))
+                logger.info("Excel workbook opened successfully")
+            except Exception as e:
+                logger.warning(f"Could not open Excel workbook: {e}")
+                wb_xlw = None
+                can_visual = False
+
+        # Per-sheet rels/comments/sheet XML parsing is independent per sheet and lxml
+        # releases the GIL, so prefetch it for the sheets we will process on a pool
+        meta_futures: Dict[str, "concurrent.futures.Future"] = {}
+        selected = [
+            info for info in ordered_info
+            if is_effectively_visible_state(info['state']) and info['name'] in values_wb.sheetnames
+        ][:num_sheets]
+
+        # With --workers > 1, extraction + JSON writing for each sheet runs in worker processes
+        # (CPU-bound, so threads would serialize on the GIL); Excel automation stays here
+        sheet_futures: List["concurrent.futures.Future"] = []
+        if workers > 1 and selected:
+            from concurrent.futures import ProcessPoolExecutor
+
+            sheet_pool = ProcessPoolExecutor(
+                max_workers=min(workers, len(selected)),
+                initializer=_sheet_worker_init,
+                initargs=(str(xlsx_path), workbook_id, images_global, extract_cells),
+            )
+        elif extract_cells and selected:
+            from concurrent.futures import ThreadPoolExecutor
+
+            meta_pool = ThreadPoolExecutor(max_workers=min(len(selected), os.cpu_count() or 1), thread_name_prefix="sheet-meta")
+            for info in selected:
+                meta_futures[info['name']] = meta_pool.submit(_parse_sheet_meta_maps_worker, ctx, info['sheet_xml'], info['sheet_rels'])
+
+        # PNG→PDF conversion and OCR (libtesseract or its subprocess) release the GIL;
+        # run them on threads so they overlap the next sheet's export
+        io_futures: List["concurrent.futures.Future"] = []
+        # Sheets whose JSON/manifest entry waits on their OCR result
+        ocr_pending: List[Tuple["concurrent.futures.Future", Path, Dict, object, Dict]] = []
+        if can_visual and wb_xlw is not None and selected:
+            from concurrent.futures import ThreadPoolExecutor
+
+            io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sheet-io")
+
+        def dispatch_sheet_json(job: Dict, values_ws) -> None:
+            if sheet_pool is not None:
+                sheet_futures.append(sheet_pool.submit(_sheet_worker_run, job))
+            else:
+                meta_future = meta_futures.get(job['sheet_name'])
+                meta = meta_future.result() if meta_future is not None else None
+                write_sheet_json(ctx, values_ws, job, workbook_id, images_global, extract_cells, meta)
+
         logger.info(f"Processing {len(ordered_info)} available sheets")
         for idx, info in enumerate(ordered_info):
             if processed >= num_sheets:
@@ -1182,10 +1806,6 @@ def preprocess_workbook(xlsx_path: Path, out_dir: Path, num_sheets: int, enable_
                 logger.warning(f"Sheet not found in values workbook: {ws_name}")
                 continue
 
-            formulas_map, hyperlinks_map, comments_map = parse_sheet_meta_maps(xlsx_path, sheet_xml, sheet_rels)
-            cells, links_to = extract_sheet_structured(values_ws, ws_name, formulas_map, hyperlinks_map, comments_map)
-            named_ranges_all = parse_defined_names_from_workbook(xlsx_path)
-
             # Drawing files mapped to this sheet
             smartart_list = sheet_to_drawings.get(ws_name, [])
 
@@ -1194,12 +1814,16 @@ def preprocess_workbook(xlsx_path: Path, out_dir: Path, num_sheets: int, enable_
             png_path = (assets_png_dir / f"{sanitize_name(ws_name)}.png") if can_visual else None
             ocr_path = (assets_ocr_dir / f"{sanitize_name(ws_name)}.txt") if (enable_ocr and can_visual) else None
 
+            ocr_future = None
             if can_visual and wb_xlw is not None:
                 try:
                     sht = wb_xlw.sheets[ws_name]
-                    export_sheet_visuals_mac(sht, pdf_path, png_path, values_ws)
+                    pdf_future = export_sheet_visuals_mac(sht, pdf_path, png_path, values_ws, ctx, io_pool)
+                    if pdf_future is not None:
+                        io_futures.append(pdf_future)
                     if enable_ocr and ocr_path is not None and png_path is not None and png_path.exists():
-                        run_ocr_if_enabled(png_path, ocr_path)
+                        ocr_future = io_pool.submit(run_ocr_if_enabled, png_path, ocr_path)
+                        io_futures.append(ocr_future)
                 except Exception as e:
                     # If visual export fails, continue with structured only
                     sys.stderr.write(f"[warn] Visual export failed for sheet '{ws_name}': {e}\n")
@@ -1207,47 +1831,69 @@ def preprocess_workbook(xlsx_path: Path, out_dir: Path, num_sheets: int, enable_
                     png_path = None
                     ocr_path = None
 
-            sheet_obj = ExtractedSheet(
-                workbook_id=workbook_id,
-                sheet_index=idx,
-                sheet_name=ws_name,
-                cells=cells,
-                named_ranges=named_ranges_all,
-                images=images_global,
-                smartart_drawings=smartart_list,
-                assets={
+            # Structured extraction + per-sheet JSON
+            sheet_json_path = sheets_dir / f"{sanitize_name(ws_name)}.json"
+            job = {
+                "sheet_index": idx,
+                "sheet_name": ws_name,
+                "sheet_xml": sheet_xml,
+                "sheet_rels": sheet_rels,
+                "smartart_drawings": smartart_list,
+                "assets": {
                     "pdf": str(pdf_path) if pdf_path else None,
                     "png": str(png_path) if png_path else None,
-                    "ocr": str(ocr_path) if (enable_ocr and ocr_path and ocr_path.exists()) else None,
+                    "ocr": None,
                 },
-                links_to=links_to,
-            )
-
-            # Write per-sheet JSON
-            logger.info(f"Writing JSON for sheet: {ws_name}")
-            sheet_json_path = sheets_dir / f"{sanitize_name(ws_name)}.json"
-            with sheet_json_path.open("w", encoding="utf-8") as f:
-                json.dump(sheet_obj.__dict__, f, ensure_ascii=False, indent=2)
+                "json_path": str(sheet_json_path),
+            }
 
-            # Append to manifest
-            manifest["sheets"].append({
+            # Append to manifest (the ocr entry is filled in once OCR has finished)
+            manifest_entry = {
                 "sheet_index": idx,
                 "sheet_name": ws_name,
                 "json": str(sheet_json_path),
                 "pdf": str(pdf_path) if pdf_path else None,
                 "png": str(png_path) if png_path else None,
-                "ocr": str(ocr_path) if (enable_ocr and ocr_path and ocr_path.exists()) else None,
+                "ocr": None,
                 "smartart_drawings": smartart_list,
-            })
+            }
+            manifest["sheets"].append(manifest_entry)
+
+            if ocr_future is not None:
+                ocr_pending.append((ocr_future, ocr_path, job, values_ws, manifest_entry))
+            else:
+                dispatch_sheet_json(job, values_ws)
 
             processed += 1
             logger.info(f"Completed sheet {processed}/{num_sheets}: {ws_name}")
 
+        # Sheets waiting on OCR get their JSON once the text file exists (or OCR gave up)
+        for ocr_future, ocr_path, job, values_ws, manifest_entry in ocr_pending:
+            ocr_future.result()
+            if ocr_path.exists():
+                job['assets']['ocr'] = manifest_entry['ocr'] = str(ocr_path)
+            dispatch_sheet_json(job, values_ws)
+
+        # Surface worker/IO failures before the manifest is written
+        for fut in io_futures + sheet_futures:
+            fut.result()
+
     finally:
         try:
             values_wb.close()
         except Exception:
             pass
+        # Both caches hold per-workbook state (worksheet objects / sheet areas)
+        _canvas_geometry.cache_clear()
+        _print_area_cache.clear()
+        if meta_pool is not None:
+            meta_pool.shutdown(wait=True, cancel_futures=True)
+        if sheet_pool is not None:
+            sheet_pool.shutdown(wait=True, cancel_futures=True)
+        if io_pool is not None:
+            io_pool.shutdown(wait=True, cancel_futures=True)
+        if ctx is not None:
+            ctx.close()
         if wb_xlw is not None:
             try:
                 wb_xlw.close()
@@ -1261,8 +1907,7 @@ def preprocess_workbook(xlsx_path: Path, out_dir: Path, num_sheets: int, enable_
 
     # Write manifest
     logger.info("Writing manifest.json")
-    with (out_dir / "manifest.json").open("w", encoding="utf-8") as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    write_json(out_dir / "manifest.json", manifest)
     
     pipeline_elapsed = time.time() - pipeline_start
     logger.info("=" * 60)
@@ -1284,6 +1929,8 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser.add_argument("--out", type=str, default="preprocessed_output", help="Output directory")
     parser.add_argument("--sheets", type=int, default=5, help="Number of sheets to process")
     parser.add_argument("--ocr", type=int, default=0, help="Enable OCR on PNGs (0/1)")
+    parser.add_argument("--cells", type=int, default=1, help="Extract cell values/formulas/links (0/1); 0 keeps only drawings and visuals")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for per-sheet extraction and JSON writing (1 = in-process)")
     return parser.parse_args(argv)
 
 
@@ -1303,8 +1950,10 @@ def main(argv: Optional[List[str]] = None) -> int:
     out_dir = Path(args.out).expanduser()
     num_sheets = max(1, int(args.sheets))
     enable_ocr = bool(int(args.ocr))
+    extract_cells = bool(int(args.cells))
+    workers = max(1, int(args.workers))
 
-    preprocess_workbook(xlsx_path, out_dir, num_sheets, enable_ocr)
+    preprocess_workbook(xlsx_path, out_dir, num_sheets, enable_ocr, extract_cells, workers)
     print(f"✓ Preprocess complete. Output at: {out_dir}")
     return 0
 
@@ -1,16 +1,230 @@
 import asyncio
+import functools
 import os
+import random
+import time
 import json
 import base64
+import hashlib
+import sqlite3
+import numpy as np
 from dotenv import load_dotenv
-from raganything import RAGAnything, RAGAnythingConfig
+from raganything import RAGAnything
 from lightrag.utils import EmbeddingFunc
 import boto3
 import botocore
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+
+from common import build_config, lightrag_concurrency_kwargs, process_and_query, working_dir_for
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+# Bedrock bodies carry long prompts and base64 images; orjson encodes/decodes them in C
+if orjson is not None:
+    _dumps_body = orjson.dumps
+    _loads_body = orjson.loads
+else:
+    def _dumps_body(obj):
+        return json.dumps(obj).encode("utf-8")
+
+    _loads_body = json.loads
+
+
+# Bedrock errors worth riding out; anything else (validation, auth, bad model id) is raised
+# at once. Same codes as bedrock_client.RETRYABLE_BEDROCK_CODES used by the OCR scripts
+RETRYABLE_BEDROCK_CODES = frozenset({
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+    "ModelStreamErrorException",
+    "InternalServerException",
+})
+BEDROCK_MAX_ATTEMPTS = int(os.getenv("BEDROCK_MAX_ATTEMPTS", "8"))
+
+
+def _with_backoff(call, **kwargs):
+    """Run a Bedrock call, retrying retryable errors with full-jitter exponential backoff.
+
+    This is the only retry layer: the client is built with botocore max_attempts=1, so
+    one logical call makes at most BEDROCK_MAX_ATTEMPTS requests.
+    """
+    for attempt in range(BEDROCK_MAX_ATTEMPTS):
+        try:
+            return call(**kwargs)
+        except botocore.exceptions.ClientError as e:
+            code = e.response.get("Error", {}).get("Code", "")
+            # Errors raised inside an event stream arrive camel-cased (throttlingException)
+            code = code[:1].upper() + code[1:]
+            if code not in RETRYABLE_BEDROCK_CODES or attempt == BEDROCK_MAX_ATTEMPTS - 1:
+                raise
+        time.sleep(random.uniform(0, min(30.0, 0.5 * 2 ** attempt)))
+
+
+def _image_block(media_type, data_b64):
+    return {"type": "image", "source": {"type": "base64", "media_type": media_type, "data": data_b64}}
+
+
+def _text_part_to_anthropic(part):
+    return {"type": "text", "text": part.get("text", "")}
+
+
+def _image_url_part_to_anthropic(part):
+    # Only inline data URLs (data:image/png;base64,XXXXX) can be forwarded; the base64
+    # payload is passed through as-is
+    img = part.get("image_url")
+    url = img.get("url") if isinstance(img, dict) else img
+    if not isinstance(url, str) or not url.startswith("data:"):
+        return None
+    header, sep, b64data = url.partition(",")
+    if not sep or ";base64" not in header:
+        return None
+    return _image_block(header[5:].split(";", 1)[0], b64data) if b64data else None
+
+
+# OpenAI content-part type -> Anthropic block builder; other part types are ignored
+_OPENAI_PART_CONVERTERS = {
+    "text": _text_part_to_anthropic,
+    "image_url": _image_url_part_to_anthropic,
+}
+
+
+def _parse_openai_messages_to_anthropic(openai_messages):
+    anthro_messages = []
+    system_chunks = []
+    for m in openai_messages or []:
+        role = m.get("role", "user")
+        content = m.get("content", "")
+
+        if role == "system":
+            if isinstance(content, list):
+                for c in content:
+                    if isinstance(c, dict) and c.get("type") == "text":
+                        system_chunks.append(c.get("text", ""))
+                    elif isinstance(c, str):
+                        system_chunks.append(c)
+            else:
+                system_chunks.append(str(content))
+            continue
+
+        blocks = []
+        if isinstance(content, str):
+            blocks.append({"type": "text", "text": content})
+        elif isinstance(content, list):
+            for c in content:
+                convert = _OPENAI_PART_CONVERTERS.get(c.get("type")) if isinstance(c, dict) else None
+                block = convert(c) if convert is not None else None
+                if block is not None:
+                    blocks.append(block)
+        anthro_messages.append(
+            {
+                "role": "assistant" if role == "assistant" else "user",
+                "content": blocks or [{"type": "text", "text": ""}],
+            }
+        )
+    system_text = "\n".join([s for s in system_chunks if s]) if system_chunks else None
+    return anthro_messages, system_text
+
+
+def _encode_fp32(vec):
+    return np.asarray(vec, dtype=np.float32).tobytes()
+
+
+def _decode_fp32(blob):
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def _encode_fp16(vec):
+    return np.asarray(vec, dtype=np.float16).tobytes()
+
+
+def _decode_fp16(blob):
+    return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+
+
+def _encode_int8(vec):
+    # Per-vector symmetric scale, stored as a float32 header ahead of the int8 codes
+    v = np.asarray(vec, dtype=np.float32)
+    peak = float(np.abs(v).max()) if v.size else 0.0
+    scale = peak / 127.0 if peak else 1.0
+    q = np.round(v / scale).astype(np.int8)
+    return np.float32(scale).tobytes() + q.tobytes()
+
+
+def _decode_int8(blob):
+    scale = np.frombuffer(blob, dtype=np.float32, count=1)[0]
+    return np.frombuffer(blob, dtype=np.int8, offset=4).astype(np.float32) * scale
+
+
+# EMB_PRECISION -> (encode, decode); vectors always come back widened to float32
+_EMBED_CODECS = {
+    "fp32": (_encode_fp32, _decode_fp32),
+    "fp16": (_encode_fp16, _decode_fp16),
+    "int8": (_encode_int8, _decode_int8),
+}
+
+
+class EmbeddingCache:
+    """Persistent embedding store keyed by sha256(model_id|dim|text[|precision]).
+
+    Vectors are raw float32 blobs by default; precision="fp16" halves them and "int8"
+    (per-vector scale) quarters them. Each precision has its own keys, so a store written
+    at one precision is never misread at another. Only this side cache shrinks: the
+    LightRAG vector store keeps float32 either way.
+    """
+
+    def __init__(self, path, precision="fp32"):
+        if precision not in _EMBED_CODECS:
+            raise ValueError(f"Unsupported embedding precision {precision!r}; expected one of {sorted(_EMBED_CODECS)}")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vec BLOB NOT NULL)")
+        self._precision = precision
+        self._encode, self._decode = _EMBED_CODECS[precision]
+
+    def key(self, model_id, dim, text):
+        suffix = "" if self._precision == "fp32" else f"|{self._precision}"
+        return hashlib.sha256(f"{model_id}|{dim}|{text}{suffix}".encode("utf-8")).digest()
+
+    def as_stored(self, vec):
+        """vec as a later cache hit will return it, so hits and misses agree exactly."""
+        return self._decode(self._encode(vec))
+
+    def get_many(self, keys):
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        decode = self._decode
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(unique), 500):
+            chunk = unique[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for k, blob in rows:
+                found[k] = decode(blob)
+        return found
+
+    def set_many(self, items):
+        encode = self._encode
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                [(k, encode(vec)) for k, vec in items],
+            )
+
+    def close(self):
+        self._db.close()
+
+
 async def main():
     # Set up AWS Bedrock configuration from .env file
     region = os.getenv("BEDROCK_REGION", "ap-southeast-1")
@@ -27,6 +241,17 @@ async def main():
         "amazon.titan-embed-text-v2:0",
     )
     embedding_dim = int(os.getenv("BEDROCK_EMBEDDING_DIM", "1024"))
+    # Re-indexing the same document reuses stored vectors; set BEDROCK_EMBED_CACHE=0 to disable
+    use_embed_cache = os.getenv("BEDROCK_EMBED_CACHE", "1") != "0"
+    # Storage precision of cached vectors: fp32 (exact), fp16 (half size) or int8 (quarter size)
+    embed_precision = os.getenv("EMB_PRECISION", "fp32").lower()
+    # Max in-flight Titan requests per embedding batch (Titan embeds one text per call)
+    embed_concurrency = max(1, int(os.getenv("BEDROCK_EMBED_CONCURRENCY", "16")))
+    # Claude calls allowed to answer with more than this many tokens use the streaming API
+    stream_min_tokens = int(os.getenv("BEDROCK_STREAM_MIN_TOKENS", "512"))
+    # System prompts at least this long get an Anthropic prompt-cache breakpoint
+    # (~4 chars/token; Claude only caches prefixes of 1024+ tokens)
+    prompt_cache_min_chars = int(os.getenv("BEDROCK_PROMPT_CACHE_MIN_CHARS", "4096"))
 
     # Initialize Bedrock client using bearer token (session token)
     session = boto3.Session(
@@ -35,7 +260,28 @@ async def main():
         aws_session_token=os.environ.get("AWS_BEARER_TOKEN_BEDROCK"),
         region_name=region,
     )
-    bedrock = session.client("bedrock-runtime")
+    # One client for every LLM/vision/embedding call. The pool covers the embedding
+    # fan-out plus concurrent LLM calls, and keepalive keeps pooled TLS sockets warm
+    bedrock_pool_size = max(int(os.getenv("BEDROCK_POOL", "64")), embed_concurrency)
+    bedrock = session.client(
+        "bedrock-runtime",
+        config=Config(
+            max_pool_connections=bedrock_pool_size,
+            # _with_backoff does the retrying; adaptive mode keeps client-side rate limiting
+            retries={"mode": "adaptive", "max_attempts": 1},
+            connect_timeout=5,
+            read_timeout=120,
+            tcp_keepalive=True,
+        ),
+    )
+
+    # Blocking Bedrock calls run on their own threads, one per pooled connection, instead
+    # of competing with other to_thread users for the loop's default executor
+    bedrock_executor = ThreadPoolExecutor(max_workers=bedrock_pool_size, thread_name_prefix="bedrock")
+
+    async def _in_bedrock_executor(fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(bedrock_executor, functools.partial(fn, *args, **kwargs))
 
     print(f"Using Bedrock region: {region}")
     print(f"Using LLM model ID: {llm_model_id}")
@@ -47,15 +293,9 @@ async def main():
     )
 
     # Create RAGAnything configuration
-    # Use a per-embedding-dimension working dir to avoid index dim mismatch with old caches
-    config = RAGAnythingConfig(
-        working_dir=f"./rag_storage_{embedding_dim}",
-        parser="mineru",  # Parser selection: mineru or docling
-        parse_method="auto",  # Parse method: auto, ocr, or txt
-        enable_image_processing=True,
-        enable_table_processing=True,
-        enable_equation_processing=True,
-    )
+    # The working dir is keyed by embedding model + dim, so old caches never mix index dims
+    working_dir = working_dir_for(embedding_model_id, embedding_dim, legacy_dir=f"./rag_storage_{embedding_dim}")
+    config = build_config(working_dir)
 
     # Helpers to invoke Anthropic (Claude) via AWS Bedrock
     def _extract_text_from_anthropic_response(resp_json):
@@ -89,26 +329,75 @@ async def main():
             )
         return messages
 
-    def _invoke_anthropic_chat(model_id, system, messages, **kwargs):
-        body = {
+    @functools.lru_cache(maxsize=64)
+    def _anthropic_body_prefix(system, max_tokens, temperature, top_p):
+        # Everything in the request body except "messages", serialized once per distinct
+        # system prompt / sampling setup and left open for the messages array
+        head = {
             "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": int(kwargs.get("max_tokens", 1024)),
-            "messages": messages,
+            "max_tokens": max_tokens,
         }
-        if system:
-            body["system"] = system
-        if "temperature" in kwargs and kwargs["temperature"] is not None:
-            body["temperature"] = float(kwargs["temperature"])
-        if "top_p" in kwargs and kwargs["top_p"] is not None:
-            body["top_p"] = float(kwargs["top_p"])
-
-        response = bedrock.invoke_model(
+        if system and len(system) >= prompt_cache_min_chars:
+            # Long, repeated system prompts are cached server-side so later calls skip their prefill
+            head["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        elif system:
+            head["system"] = system
+        if temperature is not None:
+            head["temperature"] = temperature
+        if top_p is not None:
+            head["top_p"] = top_p
+        return _dumps_body(head)[:-1] + b',"messages":'
+
+    def _anthropic_body(system, messages, **kwargs):
+        temperature = kwargs.get("temperature")
+        top_p = kwargs.get("top_p")
+        prefix = _anthropic_body_prefix(
+            system or None,
+            int(kwargs.get("max_tokens", 1024)),
+            float(temperature) if temperature is not None else None,
+            float(top_p) if top_p is not None else None,
+        )
+        return prefix + _dumps_body(messages) + b"}"
+
+    def _read_anthropic_chat_stream(model_id, body):
+        # Consume text deltas as Claude emits them instead of waiting on one full body
+        response = bedrock.invoke_model_with_response_stream(
+            modelId=model_id,
+            body=body,
+            contentType="application/json",
+            accept="application/json",
+        )
+        parts = []
+        for event in response["body"]:
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            payload = _loads_body(chunk["bytes"])
+            if payload.get("type") == "content_block_delta":
+                delta = payload.get("delta", {})
+                if delta.get("type") == "text_delta":
+                    parts.append(delta.get("text", ""))
+        return "".join(parts)
+
+    def _invoke_anthropic_chat_stream(model_id, body):
+        # Opening and reading the stream retry as one unit, so a throttling or model
+        # stream error raised mid-stream restarts the request like any other call
+        return _with_backoff(_read_anthropic_chat_stream, model_id=model_id, body=body)
+
+    def _invoke_anthropic_chat(model_id, system, messages, **kwargs):
+        body = _anthropic_body(system, messages, **kwargs)
+        # Long answers stream; short prompts keep the single round trip
+        if kwargs.get("stream") or int(kwargs.get("max_tokens", 1024)) > stream_min_tokens:
+            return _invoke_anthropic_chat_stream(model_id, body)
+
+        response = _with_backoff(
+            bedrock.invoke_model,
             modelId=model_id,
-            body=json.dumps(body).encode("utf-8"),
+            body=body,
             contentType="application/json",
             accept="application/json",
         )
-        resp_json = json.loads(response["body"].read())
+        resp_json = _loads_body(response["body"].read())
         return _extract_text_from_anthropic_response(resp_json)
 
     # Define LLM model function (text-only)
@@ -119,78 +408,17 @@ async def main():
         if prompt:
             user_blocks.append({"type": "text", "text": prompt})
         messages.append({"role": "user", "content": user_blocks or [{"type": "text", "text": ""}]})
-        return await asyncio.to_thread(_invoke_anthropic_chat, llm_model_id, system_prompt, messages, **kwargs)
+        return await _in_bedrock_executor(_invoke_anthropic_chat, llm_model_id, system_prompt, messages, **kwargs)
 
     # Define vision model function for image processing
     async def vision_model_func(
         prompt, system_prompt=None, history_messages=[], image_data=None, messages=None, **kwargs
     ):
-        def _parse_openai_messages_to_anthropic(openai_messages):
-            anthro_messages = []
-            system_chunks = []
-            for m in openai_messages or []:
-                role = m.get("role", "user")
-                content = m.get("content", "")
-
-                if role == "system":
-                    if isinstance(content, list):
-                        for c in content:
-                            if isinstance(c, dict) and c.get("type") == "text":
-                                system_chunks.append(c.get("text", ""))
-                            elif isinstance(c, str):
-                                system_chunks.append(c)
-                    else:
-                        system_chunks.append(str(content))
-                    continue
-
-                blocks = []
-                if isinstance(content, str):
-                    blocks.append({"type": "text", "text": content})
-                elif isinstance(content, list):
-                    for c in content:
-                        if isinstance(c, dict) and c.get("type") == "text":
-                            blocks.append({"type": "text", "text": c.get("text", "")})
-                        elif isinstance(c, dict) and c.get("type") == "image_url":
-                            img = c.get("image_url")
-                            url = img.get("url") if isinstance(img, dict) else img
-                            media_type = "image/jpeg"
-                            data_b64 = None
-                            if isinstance(url, str) and url.startswith("data:"):
-                                # Format: data:image/png;base64,XXXXX
-                                try:
-                                    header, b64data = url.split(",", 1)
-                                    if ";base64" in header:
-                                        mt = header.split(":", 1)[1].split(";")[0]
-                                        media_type = mt
-                                        data_b64 = b64data
-                                except Exception:
-                                    data_b64 = None
-                            if data_b64:
-                                blocks.append(
-                                    {
-                                        "type": "image",
-                                        "source": {
-                                            "type": "base64",
-                                            "media_type": media_type,
-                                            "data": data_b64,
-                                        },
-                                    }
-                                )
-                        # Ignore other block types for now
-                anthro_messages.append(
-                    {
-                        "role": "assistant" if role == "assistant" else "user",
-                        "content": blocks or [{"type": "text", "text": ""}],
-                    }
-                )
-            system_text = "\n".join([s for s in system_chunks if s]) if system_chunks else None
-            return anthro_messages, system_text
-
         # If messages format is provided (for multimodal VLM enhanced query), convert and invoke
         if messages:
             anthro_messages, sys_from_msgs = _parse_openai_messages_to_anthropic(messages)
             final_system = system_prompt or sys_from_msgs
-            return await asyncio.to_thread(_invoke_anthropic_chat, vision_model_id, final_system, anthro_messages, **kwargs)
+            return await _in_bedrock_executor(_invoke_anthropic_chat, vision_model_id, final_system, anthro_messages, **kwargs)
 
         # Traditional single image format
         if image_data:
@@ -198,87 +426,119 @@ async def main():
             content_blocks = []
             if prompt:
                 content_blocks.append({"type": "text", "text": prompt})
-            content_blocks.append(
-                {
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": media_type,
-                        "data": image_data,
-                    },
-                }
-            )
+            # image_data is already base64; it goes into the block untouched
+            content_blocks.append(_image_block(media_type, image_data))
             messages_payload = [
                 {"role": "user", "content": content_blocks},
             ]
-            return await asyncio.to_thread(_invoke_anthropic_chat, vision_model_id, system_prompt, messages_payload, **kwargs)
+            return await _in_bedrock_executor(_invoke_anthropic_chat, vision_model_id, system_prompt, messages_payload, **kwargs)
 
         # Pure text format
         return await llm_model_func(prompt, system_prompt, history_messages, **kwargs)
 
     # Define embedding function (Titan v2 via Bedrock)
-    # Resolve embedding model with graceful fallback to v1 if v2 is unavailable in-region
-    selected_embedding_model_id = embedding_model_id
-    supports_dimensions = "titan-embed-text-v2" in selected_embedding_model_id
-
-    def _bedrock_embed_titan_v2(texts):
-        vectors = []
-        for t in texts:
-            nonlocal selected_embedding_model_id, supports_dimensions
-            body = {"inputText": t}
-            # Only Titan v2 supports configurable dimensions
-            if supports_dimensions and embedding_dim:
-                body["dimensions"] = embedding_dim
-            try:
-                resp = bedrock.invoke_model(
-                    modelId=selected_embedding_model_id,
-                    body=json.dumps(body).encode("utf-8"),
-                    contentType="application/json",
-                    accept="application/json",
-                )
-            except botocore.exceptions.ClientError as e:
-                err = e.response.get("Error", {})
-                code = err.get("Code", "")
-                message = (err.get("Message", "") or str(e)).lower()
-                invalid_model = "model identifier is invalid" in message or code in (
-                    "ValidationException",
-                    "ResourceNotFoundException",
-                )
-                if invalid_model and selected_embedding_model_id != "amazon.titan-embed-text-v1":
-                    # Fallback to Titan v1 (no dimensions parameter)
-                    selected_embedding_model_id = "amazon.titan-embed-text-v1"
-                    supports_dimensions = False
-                    body = {"inputText": t}
-                    resp = bedrock.invoke_model(
-                        modelId=selected_embedding_model_id,
-                        body=json.dumps(body).encode("utf-8"),
-                        contentType="application/json",
-                        accept="application/json",
-                    )
-                else:
-                    raise
-
-            resp_json = json.loads(resp["body"].read())
-            vec = resp_json.get("embedding") or resp_json.get("embeddings")
-            if isinstance(vec, list) and vec and isinstance(vec[0], list):
-                # Some providers return [[...]]
-                vec = vec[0]
-            # Normalize vector length to configured embedding_dim to avoid downstream mismatches
-            if isinstance(vec, list) and embedding_dim:
-                try:
-                    if len(vec) > embedding_dim:
-                        vec = vec[:embedding_dim]
-                    elif len(vec) < embedding_dim:
-                        vec = vec + [0.0] * (embedding_dim - len(vec))
-                except Exception:
-                    # If vec has no len or isn't list-like, leave as is
-                    pass
-            vectors.append(vec)
-        return vectors
+    # Resolve embedding model with graceful fallback to v1 if v2 is unavailable in-region.
+    # The first embedding call settles the model on its own, before any fan-out, so one
+    # batch (and one index) never mixes vectors from two models
+    titan_v1_model_id = "amazon.titan-embed-text-v1"
+    selected_embedding_model_id = None
+    embed_resolve_lock = asyncio.Lock()
+
+    def _embedding_model_unavailable(e):
+        err = e.response.get("Error", {})
+        message = (err.get("Message", "") or str(e)).lower()
+        # Only a missing / unsupported model falls back; other validation errors
+        # (e.g. an over-long input) are raised as they are
+        return err.get("Code", "") == "ResourceNotFoundException" or any(
+            marker in message
+            for marker in ("model identifier is invalid", "model not found", "not supported", "unsupported model")
+        )
+
+    def _bedrock_embed_titan(model_id, t):
+        body = {"inputText": t}
+        # Only Titan v2 supports configurable dimensions
+        if "titan-embed-text-v2" in model_id and embedding_dim:
+            body["dimensions"] = embedding_dim
+        resp = _with_backoff(
+            bedrock.invoke_model,
+            modelId=model_id,
+            body=_dumps_body(body),
+            contentType="application/json",
+            accept="application/json",
+        )
+
+        resp_json = _loads_body(resp["body"].read())
+        vec = resp_json.get("embedding") or resp_json.get("embeddings")
+        if isinstance(vec, list) and vec and isinstance(vec[0], list):
+            # Some providers return [[...]]
+            vec = vec[0]
+        if not isinstance(vec, list):
+            raise RuntimeError(f"No embedding in {model_id} response")
+        src = np.asarray(vec, dtype=np.float32)
+        if not embedding_dim:
+            return model_id, src
+        # Normalize vector length to configured embedding_dim (truncate / zero-pad) to avoid downstream mismatches
+        out = np.zeros(embedding_dim, dtype=np.float32)
+        n = min(src.size, embedding_dim)
+        out[:n] = src[:n]
+        return model_id, out
+
+    def _bedrock_embed_resolving(t):
+        try:
+            return _bedrock_embed_titan(embedding_model_id, t)
+        except botocore.exceptions.ClientError as e:
+            if embedding_model_id == titan_v1_model_id or not _embedding_model_unavailable(e):
+                raise
+        # Fallback to Titan v1 (no dimensions parameter)
+        print(f"Embedding model {embedding_model_id} unavailable, falling back to {titan_v1_model_id}")
+        return _bedrock_embed_titan(titan_v1_model_id, t)
+
+    embed_semaphore = asyncio.Semaphore(embed_concurrency)
+
+    async def _embed_one(model_id, t):
+        async with embed_semaphore:
+            return await _in_bedrock_executor(_bedrock_embed_titan, model_id, t)
+
+    async def _embed_texts(texts):
+        """(model_id, vector) per text, every one from the same resolved model."""
+        nonlocal selected_embedding_model_id
+        head = []
+        if selected_embedding_model_id is None:
+            async with embed_resolve_lock:
+                if selected_embedding_model_id is None:
+                    answered = await _in_bedrock_executor(_bedrock_embed_resolving, texts[0])
+                    selected_embedding_model_id = answered[0]
+                    head = [answered]
+        rest = await asyncio.gather(*[_embed_one(selected_embedding_model_id, t) for t in texts[len(head):]])
+        return head + list(rest)
+
+    embed_cache = EmbeddingCache(os.path.join(working_dir, "embedding_cache.sqlite"), embed_precision) if use_embed_cache else None
 
     async def _bedrock_embed_async(texts):
-        # Wrap sync Bedrock calls in a thread so caller can await
-        return await asyncio.to_thread(_bedrock_embed_titan_v2, texts)
+        # One Titan call per text; overlap their round trips instead of summing them
+        if not texts:
+            return np.zeros((0, embedding_dim), dtype=np.float32)
+        if embed_cache is None:
+            return np.stack([vec for _, vec in await _embed_texts(texts)])
+        # Before the first call resolves the model, look up under the configured one
+        model_id = selected_embedding_model_id or embedding_model_id
+        keys = [embed_cache.key(model_id, embedding_dim, t) for t in texts]
+        cached = embed_cache.get_many(keys)
+        misses = [i for i, k in enumerate(keys) if k not in cached]
+        vectors = [cached.get(k) for k in keys]
+        if misses:
+            fresh = await _embed_texts([texts[i] for i in misses])
+            stored = []
+            # Each entry is keyed by the model that returned that vector
+            for i, (answered_model_id, vec) in zip(misses, fresh):
+                # Fresh vectors go to LightRAG at the cache's precision too, so the index
+                # never depends on which texts happened to be cached
+                vec = embed_cache.as_stored(vec)
+                vectors[i] = vec
+                stored.append((embed_cache.key(answered_model_id, embedding_dim, texts[i]), vec))
+            embed_cache.set_many(stored)
+        # LightRAG takes one (len(texts), dim) float32 matrix
+        return np.stack(vectors)
 
     embedding_func = EmbeddingFunc(
         embedding_dim=embedding_dim,
@@ -292,36 +552,16 @@ async def main():
         llm_model_func=llm_model_func,
         vision_model_func=vision_model_func,
         embedding_func=embedding_func,
+        lightrag_kwargs=lightrag_concurrency_kwargs(),
     )
 
-    # Process a document
-    await rag.process_document_complete(
-        file_path="input/fullsheets-vba_optimized.pdf",
-        output_dir="output",
-        parse_method="auto"
-    )
+    try:
+        await process_and_query(rag, working_dir)
+    finally:
+        bedrock_executor.shutdown(wait=True)
+        if embed_cache is not None:
+            embed_cache.close()
 
-    # Query the processed content
-    # Pure text query - for basic knowledge base search
-    text_result = await rag.aquery(
-        "Tell me the list of countries inside the sanctioned country list in the document",
-        mode="hybrid"
-    )
-    print("Text query result:", text_result)
-
-    # Multimodal query with specific multimodal content
-    multimodal_result = await rag.aquery_with_multimodal(
-        "Tell me the list of countries inside the sanctioned country list in the document",
-        multimodal_content=[
-            {
-                "type": "equation",
-                "latex": "P(d|q) = \\frac{P(q|d) \\cdot P(d)}{P(q)}",
-                "equation_caption": "Document relevance probability",
-            }
-        ],
-        mode="hybrid",
-    )
-    print("Multimodal query result:", multimodal_result)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,10 +1,12 @@
 import asyncio
 import os
 from dotenv import load_dotenv
-from raganything import RAGAnything, RAGAnythingConfig
+from raganything import RAGAnything
 from lightrag.llm.openai import openai_complete_if_cache, openai_embed
 from lightrag.utils import EmbeddingFunc
 
+from common import build_config, lightrag_concurrency_kwargs, process_and_query, working_dir_for
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -29,14 +31,9 @@ async def main():
     print(f"API key format valid: {api_key[:10]}...")
 
     # Create RAGAnything configuration
-    config = RAGAnythingConfig(
-        working_dir="./rag_storage",
-        parser="mineru",  # Parser selection: mineru or docling
-        parse_method="auto",  # Parse method: auto, ocr, or txt
-        enable_image_processing=True,
-        enable_table_processing=True,
-        enable_equation_processing=True,
-    )
+    embedding_dim = 3072
+    working_dir = working_dir_for(embedding_model, embedding_dim, legacy_dir="./rag_storage")
+    config = build_config(working_dir)
 
     # Define LLM model function
     def llm_model_func(prompt, system_prompt=None, history_messages=[], **kwargs):
@@ -102,7 +99,7 @@ async def main():
 
     # Define embedding function
     embedding_func = EmbeddingFunc(
-        embedding_dim=3072,
+        embedding_dim=embedding_dim,
         max_token_size=8192,
         func=lambda texts: openai_embed(
             texts,
@@ -118,34 +115,11 @@ async def main():
         llm_model_func=llm_model_func,
         vision_model_func=vision_model_func,
         embedding_func=embedding_func,
+        lightrag_kwargs=lightrag_concurrency_kwargs(),
     )
 
-    # Process a document
-    await rag.process_document_complete(
-        file_path=os.getenv("RAG_INPUT_PDF", "input/fullsheets-vba_optimized.pdf"),
-        output_dir="output",
-        parse_method="auto"
-    )
-
-    # Query the processed content
-    # Pure text query - for basic knowledge base search
-    text_result = await rag.aquery(
-        "Tell me the list of countries inside the sanctioned country list in the document",
-        mode="hybrid"
-    )
-    print("Text query result:", text_result)
+    await process_and_query(rag, working_dir)
 
-    # Multimodal query with specific multimodal content
-    multimodal_result = await rag.aquery_with_multimodal(
-        "Tell me the list of countries inside the sanctioned country list in the document",
-        multimodal_content=[{
-            "type": "equation",
-            "latex": "P(d|q) = \\frac{P(q|d) \\cdot P(d)}{P(q)}",
-            "equation_caption": "Document relevance probability"
-        }],
-        mode="hybrid"
-    )
-    print("Multimodal query result:", multimodal_result)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,20 +1,18 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import codecs
 import os
 import re
-import subprocess
 import sys
 import time
-from threading import Thread
-from queue import Queue, Empty
 
 # No page counting - just show elapsed time
 
-
-def enqueue_output(stream, queue: Queue, tag: str):
-    for line in iter(stream.readline, b''):
-        queue.put((tag, line))
-    stream.close()
+# Timer redraw period
+TICK_INTERVAL = 0.2
+# Bytes read from a child pipe per wakeup
+READ_SIZE = 65536
 
 
 def human_time(seconds: float) -> str:
@@ -33,24 +31,146 @@ def render_timer(prefix: str, elapsed: float, last_activity: str = "") -> str:
     return f"\r{prefix} | elapsed {human_time(elapsed)}{activity_info}"
 
 
+# Output directory status is re-read at most this often, not on every loop tick
+ACTIVITY_SCAN_INTERVAL = 1.0
+
+
 def get_last_activity(output_dir: str) -> str:
     """Get a simple status based on output directory contents"""
-    if not os.path.exists(output_dir):
+    try:
+        entries = os.scandir(output_dir)
+    except FileNotFoundError:
         return "Starting..."
-    
-    files = os.listdir(output_dir)
-    
+
+    # One pass over the directory; the checks below keep their original precedence
+    has_json = has_pdf = has_auto = False
+    with entries:
+        for entry in entries:
+            name = entry.name
+            if name.endswith('.json'):
+                has_json = True
+                break
+            if name.endswith('.pdf'):
+                has_pdf = True
+            if 'auto' in name:
+                has_auto = True
+
     # Look for common intermediate files
-    if any(f.endswith('.json') for f in files):
+    if has_json:
         return "Processing content..."
-    if any(f.endswith('.pdf') for f in files):
+    if has_pdf:
         return "Generating layout..."
-    if any('auto' in f for f in files):
+    if has_auto:
         return "Finalizing output..."
     
     return "Initializing..."
 
 
+# (patterns that must all match, activity) in priority order; case-insensitive patterns
+# replace the per-line .lower() copies
+_ACTIVITY_RULES = (
+    ((re.compile(r"Detected PDF file, using parser for PDF"),), "PDF detected, starting parser..."),
+    # Just show we're processing pages
+    ((re.compile(r"Processing page|Page"),), "Processing pages..."),
+    ((re.compile(r"parsing", re.I), re.compile(r"complete|finished", re.I)), "Parsing complete"),
+    ((re.compile(r"query", re.I), re.compile(r"result", re.I)), "Running queries..."),
+)
+
+
+def activity_from_line(line: str, last_activity: str) -> str:
+    # Update activity based on log content
+    for patterns, activity in _ACTIVITY_RULES:
+        if all(p.search(line) for p in patterns):
+            return activity
+    return last_activity
+
+
+class Progress:
+    """Activity and timer state shared by the pump and tick tasks."""
+
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.last_activity = ""
+        self.last_render = ""
+        self.next_scan_time = start
+
+    def draw(self, activity: str) -> None:
+        render = render_timer("Processing PDF", time.time() - self.start, activity)
+        if render != self.last_render:
+            sys.stdout.write(render)
+            sys.stdout.flush()
+            self.last_render = render
+
+
+# Progress bars (MinerU's tqdm on stderr) redraw with '\r' and no '\n', so both end a line
+_LINE_END_RE = re.compile(r'[\r\n]')
+
+
+async def pump(stream: asyncio.StreamReader, out, progress: Progress, quiet: bool) -> None:
+    # Mirror one child pipe chunk by chunk as it arrives; fixed-size reads have no
+    # line-length limit to overrun, however long a '\r'-redrawn bar runs
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    partial = ""
+    while True:
+        raw = await stream.read(READ_SIZE)
+        text = decoder.decode(raw, final=not raw)
+        if text:
+            *lines, partial = _LINE_END_RE.split(partial + text)
+            for line in lines:
+                progress.last_activity = activity_from_line(line, progress.last_activity)
+            # An unterminated line is matched once it ends; keep only a bounded tail of it
+            partial = partial[-READ_SIZE:]
+            if not quiet:
+                out.write(text)
+                out.flush()
+        if not raw:
+            break
+    if partial:
+        progress.last_activity = activity_from_line(partial, progress.last_activity)
+
+
+async def tick(progress: Progress, output_dir: str) -> None:
+    while True:
+        now = time.time()
+        # Get current activity status
+        if now >= progress.next_scan_time:
+            progress.next_scan_time = now + ACTIVITY_SCAN_INTERVAL
+            current_activity = get_last_activity(output_dir)
+            if current_activity != "Starting...":
+                progress.last_activity = current_activity
+        # Show timer with last activity
+        progress.draw(progress.last_activity)
+        await asyncio.sleep(TICK_INTERVAL)
+
+
+async def run_child(cmd, env, output_dir: str, quiet: bool) -> int:
+    progress = Progress(time.time())
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+    )
+    timer = asyncio.create_task(tick(progress, output_dir))
+    try:
+        await asyncio.gather(
+            pump(proc.stdout, sys.stdout, progress, quiet),
+            pump(proc.stderr, sys.stderr, progress, quiet),
+        )
+        returncode = await proc.wait()
+    finally:
+        timer.cancel()
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    # Child finished
+    progress.last_render = ""
+    progress.draw("Complete")
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+    return returncode
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run end-2-end RAGAnything with elapsed timer")
     parser.add_argument("--pdf", default=os.path.join(os.path.dirname(__file__), "input", "fullsheets-vba.pdf"), help="Path to the input PDF")
@@ -79,81 +199,8 @@ def main():
     if unknown:
         cmd.extend(unknown)
 
-    start = time.time()
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
-
-    q: Queue = Queue()
-    t_out = Thread(target=enqueue_output, args=(proc.stdout, q, 'O'))
-    t_err = Thread(target=enqueue_output, args=(proc.stderr, q, 'E'))
-    t_out.daemon = True
-    t_err.daemon = True
-    t_out.start()
-    t_err.start()
-
-    last_render = ''
-    last_activity = ""
-    last_log_time = start
-    try:
-        while True:
-            try:
-                tag, raw = q.get(timeout=0.05)
-                try:
-                    line = raw.decode(errors='replace')
-                except Exception:
-                    line = str(raw)
-                
-                # Update activity based on log content
-                if "Detected PDF file, using parser for PDF" in line:
-                    last_activity = "PDF detected, starting parser..."
-                elif "Processing page" in line or "Page" in line:
-                    # Just show we're processing pages
-                    last_activity = "Processing pages..."
-                elif "parsing" in line.lower() and ("complete" in line.lower() or "finished" in line.lower()):
-                    last_activity = "Parsing complete"
-                elif "query" in line.lower() and "result" in line.lower():
-                    last_activity = "Running queries..."
-                
-                # Update last log time when we get new output
-                last_log_time = time.time()
-                
-                if not args.quiet_child:
-                    if tag == 'O':
-                        sys.stdout.write(line)
-                        sys.stdout.flush()
-                    else:
-                        sys.stderr.write(line)
-                        sys.stderr.flush()
-            except Empty:
-                pass
-
-            if proc.poll() is not None:
-                break
-
-            elapsed = time.time() - start
-            
-            # Get current activity status
-            current_activity = get_last_activity(args.output_dir)
-            if current_activity != "Starting...":
-                last_activity = current_activity
-            
-            # Show timer with last activity
-            render = render_timer("Processing PDF", elapsed, last_activity)
-            if render != last_render:
-                sys.stdout.write(render)
-                sys.stdout.flush()
-                last_render = render
-        # Child finished
-        elapsed = time.time() - start
-        render = render_timer("Processing PDF", elapsed, "Complete")
-        sys.stdout.write(render + "\n")
-        sys.stdout.flush()
-    finally:
-        try:
-            proc.wait(timeout=5)
-        except Exception:
-            proc.kill()
-
-    sys.exit(proc.returncode)
+    returncode = asyncio.run(run_child(cmd, env, args.output_dir, args.quiet_child))
+    sys.exit(returncode)
 
 
 if __name__ == "__main__":
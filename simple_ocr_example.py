@@ -6,73 +6,57 @@ Exports results to markdown file
 Usage:
   python simple_ocr_example.py                    # Basic OCR
   python simple_ocr_example.py --extract-images   # OCR with sub-image extraction
+  python simple_ocr_example.py --no-cache         # Always call Bedrock, ignoring data/ocr_cache/
+  python simple_ocr_example.py 'output/*.png'     # OCR several images concurrently (OCR_CONCURRENCY, default 8)
+  python simple_ocr_example.py output/images      # Every .png/.jpg/.jpeg in a directory
 """
 
-import boto3
-import json
+import asyncio
 import os
 import re
 import sys
 import base64
+import glob
+import hashlib
+import io
 from datetime import datetime
 from pathlib import Path
 from PIL import Image
 
-# Setup AWS session with bearer token (same pattern as testBedrockOcr.py)
-session = boto3.Session(
-    aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
-    aws_session_token=os.environ.get('AWS_BEARER_TOKEN_BEDROCK'),
-    region_name='ap-southeast-1'
+import llm_cache
+from bedrock_client import (
+    IMAGE_RE, SUBIMG_PNG_COMPRESS_LEVEL, build_request, dumps_body, get_bedrock, image_media_type,
+    invoke_stream_text, invoke_with_latency, loads_body, pace_batch, upload_payload,
+    visual_element_note,
 )
 
-bedrock = session.client('bedrock-runtime')
+bedrock = get_bedrock()
 
 # Claude Sonnet 4.5 model with vision capabilities
 model_id = 'global.anthropic.claude-sonnet-4-5-20250929-v1:0'
 
+# Optional cheaper first pass, e.g. a Claude Haiku model id (same request format); its
+# answer is kept unless it looks unusable, in which case model_id redoes the image.
+# Unset sends every image straight to model_id
+first_pass_model = os.environ.get('OCR_FIRST_PASS_MODEL', '')
+
+# Cache and output keys name the whole pipeline, so tiered and single-model results
+# are never mixed up
+pipeline_id = f"{first_pass_model}>{model_id}" if first_pass_model else model_id
+
+# Images the first pass handed on to model_id during this run
+escalated_paths = []
+
 # Check if user wants to extract sub-images
 EXTRACT_SUBIMAGES = '--extract-images' in sys.argv
 
-# Path to image you want to OCR
-image_path = 'Sheet3_clean.png'
-
-# Check if image exists
-if not os.path.exists(image_path):
-    print(f"Image not found: {image_path}")
-    print("Please update the image_path variable or extract images first:")
-    print("  python excelprocessor.py -i Sheet1.xlsx -o output")
-    exit(1)
-
-# Create output directory for sub-images if needed
-input_filename = Path(image_path).stem
-if EXTRACT_SUBIMAGES:
-    output_dir = f"{input_filename}_subimages"
-    os.makedirs(output_dir, exist_ok=True)
-    print(f"Sub-image extraction enabled")
-    print(f"Sub-images will be saved to: {output_dir}/")
-    
-    # Load image for sub-image extraction
-    img = Image.open(image_path)
-    img_width, img_height = img.size
-    print(f"Image dimensions: {img_width} x {img_height} pixels")
-    print()
-
-# Read and encode image to base64
-with open(image_path, 'rb') as img_file:
-    image_data = base64.b64encode(img_file.read()).decode('utf-8')
-
-# Determine image type
-if image_path.endswith('.png'):
-    media_type = 'image/png'
-elif image_path.endswith('.jpg') or image_path.endswith('.jpeg'):
-    media_type = 'image/jpeg'
-else:
-    media_type = 'image/png'
+# Reuse responses stored in data/ocr_cache/ unless --no-cache is given
+USE_CACHE = '--no-cache' not in sys.argv
 
-# Prepare prompt based on mode
-if EXTRACT_SUBIMAGES:
-    ocr_prompt = """Analyze this image and create a structured markdown document with the following:
+# OCR prompts per mode
+PROMPTS = {
+    "basic": "Please extract all text from this image. Preserve the structure and formatting.",
+    "subimages": """Analyze this image and create a structured markdown document with the following:
 
 1. **Extract all text content** preserving hierarchy (headings, paragraphs, lists)
 
@@ -97,120 +81,203 @@ Text content...
 [IMAGE: Chart | Position: center | ApproxPercent: 40% from top, 50% from left]
 ```
 
-Provide complete markdown with all text and image placeholders."""
-else:
-    ocr_prompt = "Please extract all text from this image. Preserve the structure and formatting."
-
-# Prepare request body for Claude with vision
-request_body = {
-    "anthropic_version": "bedrock-2023-05-31",
-    "max_tokens": 8192 if EXTRACT_SUBIMAGES else 4096,
-    "messages": [
-        {
-            "role": "user",
-            "content": [
-                {
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": media_type,
-                        "data": image_data
-                    }
-                },
-                {
-                    "type": "text",
-                    "text": ocr_prompt
-                }
-            ]
-        }
-    ]
+Provide complete markdown with all text and image placeholders.""",
 }
 
-print(f"Processing image: {image_path}")
-print(f"Mode: {'OCR with sub-image extraction' if EXTRACT_SUBIMAGES else 'Basic OCR'}")
-print("Sending request to AWS Bedrock...")
-print()
+# Prepare prompt based on mode
+ocr_prompt = PROMPTS["subimages" if EXTRACT_SUBIMAGES else "basic"]
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+# First-pass answers that are this short or open with a refusal go to the full model
+_MIN_FIRST_PASS_CHARS = 20
+_REFUSAL_RE = re.compile(r"unable to|I cannot|I can't|cannot read", re.IGNORECASE)
+# End of the reply's first sentence (or line)
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s|\n')
+
+
+def looks_unusable(text):
+    text = text.strip()
+    if len(text) < _MIN_FIRST_PASS_CHARS:
+        return True
+    # Only the opening sentence is checked: the OCR'd document itself may well contain
+    # "unable to" or "cannot read" further down
+    first_sentence = _SENTENCE_END_RE.split(text, 1)[0]
+    return _REFUSAL_RE.search(first_sentence) is not None
+
+
+def model_label(model):
+    return "Claude Sonnet 4.5" if model == model_id else model
 
-if EXTRACT_SUBIMAGES:
-    # Use non-streaming for easier parsing when extracting images
-    response = bedrock.invoke_model(
-        modelId=model_id,
-        body=json.dumps(request_body),
+
+def invoke_text(model, request_body):
+    """Non-streaming OCR call; returns the response text and its token usage."""
+    response = invoke_with_latency(
+        bedrock.invoke_model,
+        modelId=model,
+        body=dumps_body(request_body),
         contentType='application/json'
     )
-    
-    response_body = json.loads(response['body'].read())
-    extracted_text = ""
-    if 'content' in response_body:
-        for content_block in response_body['content']:
-            if content_block.get('type') == 'text':
-                extracted_text += content_block.get('text', '')
-    
-    print("=== Extracted Content ===")
-    print(extracted_text)
-    print()
-    print("=== Analysis Complete ===")
-    
-else:
-    # Use streaming for basic OCR (same as testBedrockOcr.py)
-    response = bedrock.invoke_model_with_response_stream(
-        modelId=model_id,
-        body=json.dumps(request_body),
-        contentType='application/json'
+    response_body = loads_body(response['body'].read())
+    text = "".join(
+        block.get('text', '') for block in response_body.get('content', [])
+        if block.get('type') == 'text'
     )
+    return text, response_body.get('usage', {})
+
+
+def ocr_image(image_path, verbose=True, use_cache=USE_CACHE, output_stem=None):
+    """OCR one image into {stem}_out_ocr_simple.md; returns the markdown path.
+
+    verbose=False keeps the per-step output (and the streamed text) quiet so several
+    images can run side by side. use_cache=False ignores stored responses and outputs.
+    output_stem replaces the image's own stem in the output names.
+    """
+    out = print if verbose else _quiet
+
+    # Read the file once: the same bytes feed PIL and the upload payload
+    with open(image_path, 'rb') as img_file:
+        image_bytes = img_file.read()
+
+    # Generate output filename from input filename
+    input_filename = output_stem or Path(image_path).stem
+    output_filename = f"{input_filename}_out_ocr_simple.md"
+
+    # Skip Bedrock entirely when the markdown on disk came from this same image and prompt
+    source_key = llm_cache.make_key(image_bytes, ocr_prompt, pipeline_id)
+    if use_cache and llm_cache.output_is_current(output_filename, source_key):
+        out(f"{output_filename} is up to date with {image_path}, skipping Bedrock")
+        return output_filename
+
+    # Create output directory for sub-images if needed
+    if EXTRACT_SUBIMAGES:
+        output_dir = f"{input_filename}_subimages"
+        os.makedirs(output_dir, exist_ok=True)
+        out(f"Sub-image extraction enabled")
+        out(f"Sub-images will be saved to: {output_dir}/")
+        
+        # Load image for sub-image extraction
+        img = Image.open(io.BytesIO(image_bytes))
+        img_width, img_height = img.size
+        out(f"Image dimensions: {img_width} x {img_height} pixels")
+        out()
+
+    # Determine image type
+    media_type = image_media_type(image_path)
+
+    upload_bytes, media_type = upload_payload(image_bytes, Image.open(io.BytesIO(image_bytes)), media_type)
+
+    # Encode image to base64
+    image_data = base64.b64encode(upload_bytes).decode('ascii')
+
+    # Prepare request body for Claude with vision
+    request_body = build_request(image_data, media_type, ocr_prompt, 8192 if EXTRACT_SUBIMAGES else 4096)
+
+    out(f"Processing image: {image_path}")
+    out(f"Mode: {'OCR with sub-image extraction' if EXTRACT_SUBIMAGES else 'Basic OCR'}")
+
+    cache_key = llm_cache.make_key(upload_bytes, ocr_prompt, pipeline_id)
+    cached = llm_cache.get(cache_key) if use_cache else None
+
+    first_text = None
+    if cached is None and first_pass_model:
+        out(f"Sending first pass to {first_pass_model}...")
+        first_text, first_usage = invoke_text(first_pass_model, request_body)
+        if looks_unusable(first_text):
+            out(f"First pass looks unusable, re-running with {model_id}")
+            escalated_paths.append(image_path)
+            first_text = None
+
+    if cached is not None:
+        extracted_text = cached['extracted_text']
+        answered_model = cached.get('model', model_id)
+
+        out(f"Using cached response ({llm_cache.CACHE_DIR}/{cache_key}.json)")
+        out()
+        out("=== Extracted Content ===")
+        out(extracted_text)
+        out()
+        out("=== Analysis Complete ===")
+
+    elif first_text is not None:
+        extracted_text = first_text
+        answered_model = first_pass_model
+
+        llm_cache.put(cache_key, {'extracted_text': extracted_text, 'usage': first_usage, 'model': first_pass_model})
+
+        out("=== Extracted Content ===")
+        out(extracted_text)
+        out()
+        out("=== Analysis Complete ===")
+
+    elif EXTRACT_SUBIMAGES:
+        out("Sending request to AWS Bedrock...")
+        out()
+
+        # Use non-streaming for easier parsing when extracting images
+        extracted_text, usage = invoke_text(model_id, request_body)
+        answered_model = model_id
+
+        llm_cache.put(cache_key, {'extracted_text': extracted_text, 'usage': usage, 'model': model_id})
+
+        out("=== Extracted Content ===")
+        out(extracted_text)
+        out()
+        out("=== Analysis Complete ===")
     
-    print("=== Extracted Text ===")
-    print()
+    else:
+        out("Sending request to AWS Bedrock...")
+        out()
+
+        # Use streaming for basic OCR (same as testBedrockOcr.py); the text is shown once the
+        # stream completes, so a retried attempt never echoes partial output
+        extracted_text = invoke_stream_text(
+            bedrock.invoke_model_with_response_stream,
+            modelId=model_id,
+            body=dumps_body(request_body),
+            contentType='application/json'
+        )
+        answered_model = model_id
     
-    # Stream the response and collect text
-    extracted_text = ""
-    for event in response['body']:
-        chunk = json.loads(event['chunk']['bytes'].decode())
-        
-        if chunk['type'] == 'content_block_delta':
-            if 'text' in chunk['delta']:
-                text_chunk = chunk['delta']['text']
-                print(text_chunk, end='', flush=True)
-                extracted_text += text_chunk
-        elif chunk['type'] == 'message_stop':
-            break
+        out("=== Extracted Text ===")
+        out()
+        out(extracted_text, end='')
     
-    print()
-    print()
-    print("=== OCR Complete ===")
-
-# Generate output filename from input filename
-output_filename = f"{input_filename}_out_ocr_simple.md"
+        llm_cache.put(cache_key, {'extracted_text': extracted_text, 'usage': {}, 'model': model_id})
 
-# Process sub-images if enabled
-sub_images_info = []
-final_content = extracted_text
+        out()
+        out()
+        out("=== OCR Complete ===")
 
-if EXTRACT_SUBIMAGES:
-    print()
-    print("Extracting sub-images...")
-    print()
-    
-    # Parse image placeholders
-    image_pattern = r'\[IMAGE:\s*([^\|]+)\s*\|\s*Position:\s*([^\|]+)\s*\|\s*ApproxPercent:\s*(\d+)%\s*from top,\s*(\d+)%\s*from left\]'
-    image_matches = re.finditer(image_pattern, extracted_text, re.IGNORECASE)
-    
+    # Process sub-images if enabled
+    sub_images_info = []
+    final_content = extracted_text
     image_counter = 0
-    for match in image_matches:
+
+    def placeholder_to_markdown(match):
+        nonlocal image_counter
+
+        if match.group(5) is not None:
+            # Simple [IMAGE: ...] pattern
+            return visual_element_note(match.group(5))
+
         description = match.group(1).strip()
         position = match.group(2).strip()
         percent_top = int(match.group(3))
         percent_left = int(match.group(4))
-        
+    
         image_counter += 1
-        
-        print(f"Sub-image {image_counter}: {description}")
-        print(f"  Position: {position} ({percent_top}% from top, {percent_left}% from left)")
-        
+    
+        out(f"Sub-image {image_counter}: {description}")
+        out(f"  Position: {position} ({percent_top}% from top, {percent_left}% from left)")
+    
         # Calculate bounding box
         center_x = int(img_width * percent_left / 100)
         center_y = int(img_height * percent_top / 100)
-        
+    
         # Estimate size based on description
         if 'icon' in description.lower() or 'logo' in description.lower():
             box_width = int(img_width * 0.10)
@@ -221,21 +288,22 @@ if EXTRACT_SUBIMAGES:
         else:
             box_width = int(img_width * 0.20)
             box_height = int(img_height * 0.15)
-        
+    
         left = max(0, center_x - box_width // 2)
         top = max(0, center_y - box_height // 2)
         right = min(img_width, center_x + box_width // 2)
         bottom = min(img_height, center_y + box_height // 2)
-        
+    
         # Extract and save sub-image
         try:
             sub_img = img.crop((left, top, right, bottom))
             sub_img_filename = f"subimg_{image_counter:02d}_{position.replace('-', '_')}.png"
             sub_img_path = os.path.join(output_dir, sub_img_filename)
-            sub_img.save(sub_img_path)
-            
-            print(f"  ✓ Saved: {sub_img_path} ({right-left}x{bottom-top} px)")
-            
+            sub_img.save(sub_img_path, format='PNG', compress_level=SUBIMG_PNG_COMPRESS_LEVEL)
+        
+            out(f"  ✓ Saved: {sub_img_path} ({right-left}x{bottom-top} px)")
+            out()
+        
             sub_images_info.append({
                 'original_placeholder': match.group(0),
                 'description': description,
@@ -244,82 +312,207 @@ if EXTRACT_SUBIMAGES:
                 'relative_path': f"{output_dir}/{sub_img_filename}"
             })
         except Exception as e:
-            print(f"  ✗ Error: {e}")
-        
-        print()
+            out(f"  ✗ Error: {e}")
+            out()
+            # Left as a plain visual-element note, as for placeholders without coordinates
+            return visual_element_note(match.group(0)[len('[IMAGE:'):-1])
     
-    # Replace placeholders with markdown images
-    for img_info in sub_images_info:
-        markdown_img = f"\n\n![{img_info['description']}]({img_info['relative_path']})\n\n*{img_info['description']}*\n\n"
-        final_content = final_content.replace(img_info['original_placeholder'], markdown_img)
+        # Replace placeholder with markdown image
+        return f"\n\n![{description}]({output_dir}/{sub_img_filename})\n\n*{description}*\n\n"
+
+    if EXTRACT_SUBIMAGES:
+        out()
+        out("Extracting sub-images...")
+        out()
     
-    # Handle any remaining simple [IMAGE: ...] patterns
-    simple_image_pattern = r'\[IMAGE:\s*([^\]]+)\]'
-    final_content = re.sub(
-        simple_image_pattern,
-        lambda m: f"\n\n> 📷 **Visual Element:** {m.group(1).strip()}\n\n",
-        final_content
-    )
+        final_content = IMAGE_RE.sub(placeholder_to_markdown, extracted_text)
 
-# Create markdown content
-if EXTRACT_SUBIMAGES:
-    markdown_content = f"""# OCR Analysis with Sub-Images
+    # Write the markdown straight to disk piece by piece instead of first assembling it
+    # into one string alongside the extracted text
+    with open(output_filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(llm_cache.source_marker(source_key))
+        if EXTRACT_SUBIMAGES:
+            f.write(f"""# OCR Analysis with Sub-Images
 
 **Source Image:** `{image_path}`  
 **Processed:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  
-**Model:** Claude Sonnet 4.5 (Bedrock)  
+**Model:** {model_label(answered_model)} (Bedrock)  
 **Sub-images extracted:** {len(sub_images_info)}  
 **Sub-images directory:** `{output_dir}/`
 
 ---
 
-{final_content}
+""")
+            f.write(final_content)
+            f.write("""
 
 ---
 
 ## Extracted Sub-Images
 
-"""
+""")
     
-    if sub_images_info:
-        markdown_content += "\n| # | Description | Position | File |\n"
-        markdown_content += "|---|-------------|----------|------|\n"
-        for idx, img_info in enumerate(sub_images_info, 1):
-            markdown_content += f"| {idx} | {img_info['description']} | {img_info['position']} | `{img_info['filename']}` |\n"
-    else:
-        markdown_content += "\nNo sub-images were automatically extracted.\n"
+            if sub_images_info:
+                f.write("\n| # | Description | Position | File |\n")
+                f.write("|---|-------------|----------|------|\n")
+                f.writelines(
+                    f"| {idx} | {img_info['description']} | {img_info['position']} | `{img_info['filename']}` |\n"
+                    for idx, img_info in enumerate(sub_images_info, 1)
+                )
+            else:
+                f.write("\nNo sub-images were automatically extracted.\n")
     
-    markdown_content += f"\n\n*Generated by AWS Bedrock OCR with Sub-Image Extraction*\n"
+            f.write(f"\n\n*Generated by AWS Bedrock OCR with Sub-Image Extraction*\n")
     
-else:
-    markdown_content = f"""# OCR Results
+        else:
+            f.write(f"""# OCR Results
 
 **Source Image:** `{image_path}`  
 **Processed:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  
-**Model:** Claude Sonnet 4.5 (Bedrock)
+**Model:** {model_label(answered_model)} (Bedrock)
 
 ---
 
 ## Extracted Text
 
-{final_content}
+""")
+            f.write(final_content)
+            f.write("""
 
 ---
 
 *Generated by AWS Bedrock OCR*
-"""
-
-# Save to markdown file
-with open(output_filename, 'w', encoding='utf-8') as f:
-    f.write(markdown_content)
-
-print()
-print("=" * 80)
-print("✓ Processing Complete!")
-print("=" * 80)
-print(f"Markdown output: {output_filename}")
-if EXTRACT_SUBIMAGES and sub_images_info:
-    print(f"Sub-images directory: {output_dir}/")
-    print(f"Sub-images extracted: {len(sub_images_info)}")
-print("=" * 80)
-
+""")
+
+    out()
+    out("=" * 80)
+    out("✓ Processing Complete!")
+    out("=" * 80)
+    out(f"Markdown output: {output_filename}")
+    if EXTRACT_SUBIMAGES and sub_images_info:
+        out(f"Sub-images directory: {output_dir}/")
+        out(f"Sub-images extracted: {len(sub_images_info)}")
+    out("=" * 80)
+
+    return output_filename
+
+
+def output_stems(image_paths):
+    """Output stem per path; images sharing a stem (a/sheet.png, b/sheet.png) get a path hash suffix."""
+    stems = {path: Path(path).stem for path in image_paths}
+    # Case-insensitive, since the outputs may land on a case-insensitive filesystem
+    counts = {}
+    for stem in stems.values():
+        counts[stem.lower()] = counts.get(stem.lower(), 0) + 1
+    for path, stem in stems.items():
+        if counts[stem.lower()] > 1:
+            path_hash = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]
+            stems[path] = f"{stem}_{path_hash}"
+    return stems
+
+
+async def ocr_images(image_paths, concurrency):
+    # Each image is an independent Bedrock call; overlap them, bounded to stay inside
+    # the account's request-rate limits
+    semaphore = asyncio.Semaphore(concurrency)
+    pace_batch()
+
+    # Workbooks often repeat the same logo or header image on every sheet; group the
+    # paths by content so only the first copy of each image goes to Bedrock
+    groups = {}
+    for path in image_paths:
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        groups.setdefault(digest, []).append(path)
+    if len(groups) < len(image_paths):
+        print(f"{len(groups)} unique images, {len(image_paths) - len(groups)} duplicates reuse their OCR")
+
+    # Batch outputs all land in the working directory, so same-named inputs from
+    # different directories must not overwrite each other's markdown and crops
+    stems = output_stems(image_paths)
+
+    async def ocr_one(path, use_cache):
+        async with semaphore:
+            try:
+                output_filename = await asyncio.to_thread(ocr_image, path, False, use_cache, stems[path])
+            except Exception as e:
+                print(f"✗ {path}: {e}")
+                return None
+        print(f"✓ {path} -> {output_filename}")
+        return output_filename
+
+    async def ocr_group(paths):
+        first = await ocr_one(paths[0], USE_CACHE)
+        results = {paths[0]: first}
+        for path in paths[1:]:
+            if first is None:
+                print(f"✗ {path}: same image as {paths[0]}, which failed")
+                results[path] = None
+            else:
+                # The first copy just stored its response in llm_cache, so this is a cache
+                # hit even under --no-cache
+                results[path] = await ocr_one(path, True)
+        return results
+
+    results = {}
+    for group_results in await asyncio.gather(*[ocr_group(g) for g in groups.values()]):
+        results.update(group_results)
+    return [results[p] for p in image_paths]
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def list_images(directory):
+    # One scandir pass: names and file types come from the directory entries themselves
+    with os.scandir(directory) as entries:
+        return sorted(
+            e.path for e in entries
+            if e.name.lower().endswith(IMAGE_EXTENSIONS) and e.is_file()
+        )
+
+
+def main():
+    # Images, directories of images or glob patterns to OCR; defaults to a single sheet screenshot
+    patterns = [arg for arg in sys.argv[1:] if not arg.startswith('--')] or ['Sheet3_clean.png']
+    image_paths = []
+    seen = set()
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+        elif os.path.isdir(pattern):
+            matches = list_images(pattern)
+        else:
+            matches = [pattern]
+        for m in matches:
+            if m not in seen:
+                seen.add(m)
+                image_paths.append(m)
+
+    # Check if images exist
+    missing = [p for p in image_paths if not os.path.exists(p)]
+    for path in missing:
+        print(f"Image not found: {path}")
+    if missing or not image_paths:
+        print("Please pass the image path(s) to OCR or extract images first:")
+        print("  python excelprocessor.py -i Sheet1.xlsx -o output")
+        exit(1)
+
+    if len(image_paths) == 1:
+        ocr_image(image_paths[0])
+        return
+
+    concurrency = max(1, int(os.environ.get('OCR_CONCURRENCY', '8')))
+    print(f"OCR of {len(image_paths)} images, {concurrency} at a time")
+    print(f"Mode: {'OCR with sub-image extraction' if EXTRACT_SUBIMAGES else 'Basic OCR'}")
+    results = asyncio.run(ocr_images(image_paths, concurrency))
+    failed = sum(1 for r in results if r is None)
+    print(f"Done: {len(results) - failed} succeeded, {failed} failed")
+    if first_pass_model:
+        print(f"Escalated to {model_id}: {len(escalated_paths)} of {len(results)} images")
+    if failed:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
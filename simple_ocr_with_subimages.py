@@ -4,31 +4,46 @@ This script:
 1. Analyzes the image to identify sub-images (charts, diagrams, icons, photos)
 2. Extracts those sub-images and saves them
 3. Creates a markdown output with embedded sub-images in their proper positions
+
+Pass --no-cache to always call Bedrock instead of reusing data/ocr_cache/
+Pass -v to list each sub-image as it is extracted
 """
 
-import boto3
-import json
 import os
-import re
+import sys
 import base64
+import hashlib
+import logging
+import shutil
 from datetime import datetime
 from pathlib import Path
 from PIL import Image
 import io
 
-# Setup AWS session with bearer token (same pattern as testBedrockOcr.py)
-session = boto3.Session(
-    aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
-    aws_session_token=os.environ.get('AWS_BEARER_TOKEN_BEDROCK'),
-    region_name='ap-southeast-1'
+import llm_cache
+from bedrock_client import (
+    IMAGE_RE, SUBIMG_PNG_COMPRESS_LEVEL, build_request, dumps_body, get_bedrock, image_media_type,
+    invoke_with_latency, loads_body, upload_payload, visual_element_note,
+)
+
+# Configure logging: per-sub-image details only under -v
+logging.basicConfig(
+    level=logging.INFO if '-v' in sys.argv else logging.WARNING,
+    format='%(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
 )
+logger = logging.getLogger(__name__)
 
-bedrock = session.client('bedrock-runtime')
+bedrock = get_bedrock()
 
 # Claude Sonnet 4.5 model with vision capabilities
 model_id = 'global.anthropic.claude-sonnet-4-5-20250929-v1:0'
 
+# Reuse responses stored in data/ocr_cache/ unless --no-cache is given
+USE_CACHE = '--no-cache' not in sys.argv
+
 # Path to image you want to OCR
 image_path = 'sheet2.png'
 
@@ -48,23 +63,15 @@ print(f"Processing image: {image_path}")
 print(f"Sub-images will be saved to: {output_dir}/")
 print()
 
+# Read the file once: the same bytes feed PIL and the upload payload
+with open(image_path, 'rb') as img_file:
+    image_bytes = img_file.read()
+
 # Load the image for processing
-img = Image.open(image_path)
+img = Image.open(io.BytesIO(image_bytes))
 img_width, img_height = img.size
 print(f"Image dimensions: {img_width} x {img_height} pixels")
 
-# Read and encode image to base64
-with open(image_path, 'rb') as img_file:
-    image_data = base64.b64encode(img_file.read()).decode('utf-8')
-
-# Determine image type
-if image_path.endswith('.png'):
-    media_type = 'image/png'
-elif image_path.endswith('.jpg') or image_path.endswith('.jpeg'):
-    media_type = 'image/jpeg'
-else:
-    media_type = 'image/png'
-
 # Enhanced prompt to identify sub-images with position information
 analysis_prompt = """Analyze this image and create a structured markdown document with the following:
 
@@ -105,48 +112,56 @@ More text content...
 
 Provide the complete markdown with all text and image placeholders in their correct positions."""
 
+# Generate output filename
+output_filename = f"{input_filename}_out_ocr_simple.md"
+
+# Skip Bedrock entirely when the markdown on disk came from this same image and prompt
+source_key = llm_cache.make_key(image_bytes, analysis_prompt, model_id)
+if USE_CACHE and llm_cache.output_is_current(output_filename, source_key):
+    print(f"{output_filename} is up to date with {image_path}, skipping Bedrock")
+    sys.exit(0)
+
+# Determine image type
+media_type = image_media_type(image_path)
+
+upload_bytes, media_type = upload_payload(image_bytes, img, media_type)
+
+# Encode image to base64
+image_data = base64.b64encode(upload_bytes).decode('ascii')
+
 # Prepare request body for Claude with vision
-request_body = {
-    "anthropic_version": "bedrock-2023-05-31",
-    "max_tokens": 8192,
-    "messages": [
-        {
-            "role": "user",
-            "content": [
-                {
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": media_type,
-                        "data": image_data
-                    }
-                },
-                {
-                    "type": "text",
-                    "text": analysis_prompt
-                }
-            ]
-        }
-    ]
-}
+request_body = build_request(image_data, media_type, analysis_prompt, 8192)
 
-print("Analyzing image and identifying sub-images...")
-print()
+cache_key = llm_cache.make_key(upload_bytes, analysis_prompt, model_id)
+cached = llm_cache.get(cache_key) if USE_CACHE else None
 
-# Call Bedrock (non-streaming for easier parsing)
-response = bedrock.invoke_model(
-    modelId=model_id,
-    body=json.dumps(request_body),
-    contentType='application/json'
-)
+if cached is not None:
+    print(f"Using cached response ({llm_cache.CACHE_DIR}/{cache_key}.json)")
+    print()
+    extracted_content = cached['extracted_text']
+    usage = cached.get('usage', {})
+else:
+    print("Analyzing image and identifying sub-images...")
+    print()
 
-# Parse response
-response_body = json.loads(response['body'].read())
-extracted_content = ""
-if 'content' in response_body:
-    for content_block in response_body['content']:
-        if content_block.get('type') == 'text':
-            extracted_content += content_block.get('text', '')
+    # Call Bedrock (non-streaming for easier parsing)
+    response = invoke_with_latency(
+        bedrock.invoke_model,
+        modelId=model_id,
+        body=dumps_body(request_body),
+        contentType='application/json'
+    )
+
+    # Parse response
+    response_body = loads_body(response['body'].read())
+    extracted_content = ""
+    if 'content' in response_body:
+        for content_block in response_body['content']:
+            if content_block.get('type') == 'text':
+                extracted_content += content_block.get('text', '')
+    usage = response_body.get('usage', {})
+
+    llm_cache.put(cache_key, {'extracted_text': extracted_content, 'usage': usage})
 
 print("=== Analysis Complete ===")
 print()
@@ -154,16 +169,24 @@ print("Extracted content preview:")
 print(extracted_content[:500] + "..." if len(extracted_content) > 500 else extracted_content)
 print()
 
-# Parse image placeholders from the content
-# Pattern: [IMAGE: description | Position: position | ApproxPercent: X% from top, Y% from left]
-image_pattern = r'\[IMAGE:\s*([^\|]+)\s*\|\s*Position:\s*([^\|]+)\s*\|\s*ApproxPercent:\s*(\d+)%\s*from top,\s*(\d+)%\s*from left\]'
-image_matches = re.finditer(image_pattern, extracted_content, re.IGNORECASE)
+# Crops are cached by (source image hash, bounding box), so re-runs copy the PNG
+# instead of cropping and re-encoding it
+SUBIMG_CACHE_DIR = os.path.join('data', 'subimg_cache')
+os.makedirs(SUBIMG_CACHE_DIR, exist_ok=True)
+image_sha = hashlib.sha256(image_bytes).hexdigest()[:16]
 
 # Extract and save sub-images
 sub_images_info = []
 image_counter = 0
 
-for match in image_matches:
+
+def placeholder_to_markdown(match):
+    global image_counter
+
+    if match.group(5) is not None:
+        # Placeholder without coordinates
+        return visual_element_note(match.group(5))
+
     description = match.group(1).strip()
     position = match.group(2).strip()
     percent_top = int(match.group(3))
@@ -171,9 +194,6 @@ for match in image_matches:
     
     image_counter += 1
     
-    print(f"Found sub-image {image_counter}: {description}")
-    print(f"  Position: {position} ({percent_top}% from top, {percent_left}% from left)")
-    
     # Calculate approximate bounding box
     # Use a heuristic to estimate the size of the sub-image
     # Default: 20% width, 15% height around the center point
@@ -199,13 +219,21 @@ for match in image_matches:
     
     # Extract sub-image
     try:
-        sub_img = img.crop((left, top, right, bottom))
         sub_img_filename = f"subimg_{image_counter:02d}_{position.replace('-', '_')}.png"
         sub_img_path = os.path.join(output_dir, sub_img_filename)
-        sub_img.save(sub_img_path)
+        crop_cache_path = os.path.join(SUBIMG_CACHE_DIR, f"{image_sha}_{left}_{top}_{right}_{bottom}.png")
+        if not os.path.exists(crop_cache_path):
+            sub_img = img.crop((left, top, right, bottom))
+            tmp_path = f"{crop_cache_path}.{os.getpid()}.tmp"
+            sub_img.save(tmp_path, format='PNG', compress_level=SUBIMG_PNG_COMPRESS_LEVEL)
+            os.replace(tmp_path, crop_cache_path)
+        shutil.copyfile(crop_cache_path, sub_img_path)
         
-        print(f"  ✓ Saved to: {sub_img_path}")
-        print(f"  Dimensions: {right-left} x {bottom-top} pixels")
+        logger.info(
+            "Found sub-image %d: %s @ %s (%d%% from top, %d%% from left) -> %s (%d x %d px)",
+            image_counter, description, position, percent_top, percent_left,
+            sub_img_path, right - left, bottom - top,
+        )
         
         # Store info for markdown generation
         sub_images_info.append({
@@ -217,31 +245,22 @@ for match in image_matches:
         })
         
     except Exception as e:
-        print(f"  ✗ Error extracting sub-image: {e}")
+        logger.warning("✗ Error extracting sub-image %d (%s): %s", image_counter, description, e)
+        # Left as a plain visual-element note, as for placeholders without coordinates
+        return visual_element_note(match.group(0)[len('[IMAGE:'):-1])
     
-    print()
-
-# Replace image placeholders with actual markdown image references
-final_markdown = extracted_content
-
-for img_info in sub_images_info:
     # Replace the placeholder with markdown image syntax
-    markdown_img = f"![{img_info['description']}]({img_info['relative_path']})\n\n*{img_info['description']}*"
-    final_markdown = final_markdown.replace(img_info['original_placeholder'], markdown_img)
-
-# Also handle any remaining simple [IMAGE: ...] patterns without coordinates
-simple_image_pattern = r'\[IMAGE:\s*([^\]]+)\]'
-final_markdown = re.sub(
-    simple_image_pattern,
-    lambda m: f"\n\n> 📷 **Visual Element:** {m.group(1).strip()}\n\n",
-    final_markdown
-)
+    return f"![{description}]({output_dir}/{sub_img_filename})\n\n*{description}*"
 
-# Generate output filename
-output_filename = f"{input_filename}_out_ocr_simple.md"
 
-# Create comprehensive markdown content
-markdown_content = f"""# OCR Analysis with Sub-Images
+# Replace image placeholders with actual markdown image references
+final_markdown = IMAGE_RE.sub(placeholder_to_markdown, extracted_content)
+
+# Write the markdown straight to disk piece by piece instead of first assembling it
+# into one string alongside the extracted text
+with open(output_filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+    f.write(llm_cache.source_marker(source_key))
+    f.write(f"""# OCR Analysis with Sub-Images
 
 **Source Image:** `{image_path}`  
 **Processed:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  
@@ -251,39 +270,39 @@ markdown_content = f"""# OCR Analysis with Sub-Images
 
 ---
 
-{final_markdown}
+""")
+    f.write(final_markdown)
+    f.write("""
 
 ---
 
 ## Extracted Sub-Images
 
-"""
+""")
 
-# Add a table of all sub-images
-if sub_images_info:
-    markdown_content += "\n| # | Description | Position | File |\n"
-    markdown_content += "|---|-------------|----------|------|\n"
-    for idx, img_info in enumerate(sub_images_info, 1):
-        markdown_content += f"| {idx} | {img_info['description']} | {img_info['position']} | `{img_info['filename']}` |\n"
-else:
-    markdown_content += "\nNo sub-images were automatically extracted.\n"
+    # Add a table of all sub-images
+    if sub_images_info:
+        f.write("\n| # | Description | Position | File |\n")
+        f.write("|---|-------------|----------|------|\n")
+        f.writelines(
+            f"| {idx} | {img_info['description']} | {img_info['position']} | `{img_info['filename']}` |\n"
+            for idx, img_info in enumerate(sub_images_info, 1)
+        )
+    else:
+        f.write("\nNo sub-images were automatically extracted.\n")
 
-markdown_content += f"""
+    f.write(f"""
 
 ---
 
 ## Technical Details
 
 - **Original image dimensions:** {img_width} x {img_height} pixels
-- **Total tokens used:** {response_body.get('usage', {}).get('total_tokens', 'N/A')}
+- **Total tokens used:** {usage.get('total_tokens', 'N/A')}
 - **Processing method:** AWS Bedrock with Claude Sonnet 4.5 vision analysis
 
 *Generated by AWS Bedrock OCR with Sub-Image Extraction*
-"""
-
-# Save to markdown file
-with open(output_filename, 'w', encoding='utf-8') as f:
-    f.write(markdown_content)
+""")
 
 print("=" * 80)
 print("✓ Processing Complete!")